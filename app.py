@@ -7,25 +7,31 @@ coordinate system transformations.
 """
 
 from fastapi import FastAPI, HTTPException, Response, Query, Request
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 import httpx
+import base64
 import logging
-from typing import Optional, Dict
+import sys
+from typing import Optional, Dict, List, Tuple
 import asyncio
-from cachetools import TTLCache
 import io
 import time
+import orjson
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
 
 from config import settings
-from coordinates import TileCoordinate, CoordinateTransformer
+from coordinates import TileCoordinate, CoordinateTransformer, MAX_TILE_ZOOM
 from wmts_client import WMTSClient
 from coordinate_systems import list_coordinate_systems, get_coordinate_system
+from crs_fetcher import close_crs_fetcher
+from wmts_capabilities import use_capabilities_client, close_capabilities_client
+from tile_cache import ShardedTileCache, BoundedKeySet, make_tile_key
+from single_flight import SingleFlight
 
 logging.basicConfig(
     level=getattr(logging, settings.LOG_LEVEL.upper()),
@@ -36,7 +42,8 @@ logger = logging.getLogger(__name__)
 app = FastAPI(
     title="MapMap Tile Proxy",
     description="Production-ready WMTS tile proxy with coordinate transformation",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # Rate limiting
@@ -63,43 +70,226 @@ REQUEST_DURATION = Histogram('mapmap_request_duration_seconds', 'Request duratio
 TILE_CACHE_HITS = Counter('mapmap_cache_hits_total', 'Cache hits')
 TILE_CACHE_MISSES = Counter('mapmap_cache_misses_total', 'Cache misses')
 
-tile_cache = TTLCache(maxsize=settings.CACHE_SIZE, ttl=settings.CACHE_TTL)
-transformers: Dict[str, CoordinateTransformer] = {}
-clients: Dict[str, WMTSClient] = {}
+# Resolved (request counter, duration histogram) children keyed by (endpoint, method, status),
+# so the middleware skips prometheus label resolution after the first request of each kind
+_metric_children: Dict[Tuple[str, str, int], Tuple[Counter, Histogram]] = {}
+
+
+def _request_metrics(endpoint: str, method: str, status: int) -> Tuple[Counter, Histogram]:
+    key = (endpoint, method, status)
+    children = _metric_children.get(key)
+    if children is None:
+        children = _metric_children[key] = (
+            REQUEST_COUNT.labels(endpoint=endpoint, method=method, status=status),
+            REQUEST_DURATION.labels(endpoint=endpoint)
+        )
+    return children
+
+
+for _status in (200, 304, 400, 404):
+    _request_metrics("tiles", "GET", _status)
+
+# Request metrics are queued by the middleware and recorded by a single background task
+metrics_queue: Optional["asyncio.Queue[Tuple[str, str, int, float]]"] = None
+
+
+async def _drain_metrics(queue: asyncio.Queue):
+    while True:
+        endpoint, method, status, duration = await queue.get()
+        request_count, request_duration = _request_metrics(endpoint, method, status)
+        request_count.inc()
+        request_duration.observe(duration)
+
+tile_cache = ShardedTileCache(
+    maxsize=settings.CACHE_SIZE,
+    ttl=settings.CACHE_TTL,
+    grace=settings.CACHE_GRACE_TTL,
+    max_bytes=settings.CACHE_BYTES
+)
+# Endpoint names are a small closed set: index them once so the tile path
+# hashes the requested name a single time and uses list indexing afterwards
+endpoint_names: List[str] = [sys.intern(name) for name in settings.WMTS_ENDPOINTS]
+endpoint_index: Dict[str, int] = {name: i for i, name in enumerate(endpoint_names)}
+transformers: List[Optional[CoordinateTransformer]] = [None] * len(endpoint_names)
+clients: List[Optional[WMTSClient]] = [None] * len(endpoint_names)
+# Tiles whose transformed coordinates fell outside the WMTS server bounds
+out_of_bounds_tiles = BoundedKeySet(maxsize=50000)
+refreshing_tiles: Dict[int, asyncio.Task] = {}
+inflight_tiles = SingleFlight()
+
+# 1x1 transparent PNG served for tiles outside the WMTS server bounds
+TRANSPARENT_PNG = base64.b64decode("iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42mNkYAAAAAYAAjCB0C8AAAAASUVORK5CYII=")
+OOB_HEADERS = {"Cache-Control": "public, max-age=86400"}
+
+# Bodies of the informational endpoints depend only on settings, so serialize them once
+ROOT_JSON = orjson.dumps({
+    "message": "MapMap Tile Proxy", 
+    "version": "1.0.0",
+    "endpoints": list(settings.WMTS_ENDPOINTS.keys()),
+    "coordinate_systems": list_coordinate_systems()
+})
+COORDINATE_SYSTEMS_JSON = orjson.dumps(list_coordinate_systems())
+
+
+def _endpoints_info() -> Dict[str, Dict[str, str]]:
+    endpoints = {}
+    for name in settings.WMTS_ENDPOINTS:
+        config = settings.get_endpoint(name)
+        endpoints[name] = {
+            "url": config.url,
+            "layer": config.layer,
+            "coordinate_system": config.coordinate_system
+        }
+    return endpoints
+
+
+ENDPOINTS_JSON = orjson.dumps(_endpoints_info())
+
+
+def out_of_bounds_response() -> Response:
+    """Build a fresh response per request, since middleware mutates response headers in place"""
+    return Response(content=TRANSPARENT_PNG, media_type="image/png", headers=OOB_HEADERS)
+
+
+TILE_CACHE_CONTROL = f"public, max-age={settings.CACHE_TTL}, stale-while-revalidate={settings.CACHE_GRACE_TTL}"
+# Tiles served from the grace window are already past their TTL, so clients
+# must not keep them fresh for another full TTL
+STALE_TILE_CACHE_CONTROL = f"public, max-age=0, stale-while-revalidate={settings.CACHE_GRACE_TTL}"
+
+
+def tile_response(request: Request, tile_data: bytes, etag: str, is_stale: bool = False) -> Response:
+    """Build a tile response with caching headers, or a 304 if the client copy is current"""
+    headers = {"ETag": etag, "Cache-Control": STALE_TILE_CACHE_CONTROL if is_stale else TILE_CACHE_CONTROL}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or
+                          etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))):
+        return Response(status_code=304, headers=headers)
+    return Response(content=tile_data, media_type="image/png", headers=headers)
+
+
+def get_endpoint_id(endpoint_name: str) -> int:
+    """Map an endpoint name to its index, used for cache keys and per-endpoint lists"""
+    endpoint_id = endpoint_index.get(endpoint_name)
+    if endpoint_id is None:
+        raise ValueError(f"Unknown endpoint: {endpoint_name}")
+    return endpoint_id
+
+
+def transformer_for(endpoint_id: int) -> CoordinateTransformer:
+    transformer = transformers[endpoint_id]
+    if transformer is None:
+        endpoint = settings.get_endpoint(endpoint_names[endpoint_id])
+        transformer = transformers[endpoint_id] = CoordinateTransformer(endpoint.coordinate_system)
+    return transformer
+
+
+def client_for(endpoint_id: int) -> WMTSClient:
+    client = clients[endpoint_id]
+    if client is None:
+        client = clients[endpoint_id] = WMTSClient(
+            endpoint_names[endpoint_id], client=getattr(app.state, "http", None)
+        )
+    return client
 
 
 def get_transformer(endpoint_name: Optional[str] = None) -> CoordinateTransformer:
-    name = endpoint_name or settings.DEFAULT_ENDPOINT
-    if name not in transformers:
-        endpoint = settings.get_endpoint(name)
-        transformers[name] = CoordinateTransformer(endpoint.coordinate_system)
-    return transformers[name]
+    return transformer_for(get_endpoint_id(endpoint_name or settings.DEFAULT_ENDPOINT))
 
 
 def get_client(endpoint_name: Optional[str] = None) -> WMTSClient:
-    name = endpoint_name or settings.DEFAULT_ENDPOINT
-    if name not in clients:
-        clients[name] = WMTSClient(name)
-    return clients[name]
+    return client_for(get_endpoint_id(endpoint_name or settings.DEFAULT_ENDPOINT))
+
+
+async def _fetch_coalesced(cache_key: int, client: WMTSClient, tile_coord) -> Optional[Tuple[bytes, str]]:
+    """Fetch and cache a tile, sharing one upstream request among concurrent callers.
+    
+    Returns ``(tile_data, etag)`` or None if the upstream had no tile.
+    """
+    return await inflight_tiles.run(cache_key, _fetch_and_cache, cache_key, client, tile_coord)
+
+
+async def _fetch_and_cache(cache_key: int, client: WMTSClient, tile_coord) -> Optional[Tuple[bytes, str]]:
+    tile_data = await client.fetch_tile(tile_coord)
+    return (tile_data, tile_cache.set(cache_key, tile_data)) if tile_data else None
+
+
+async def _refresh_tile(cache_key: int, endpoint_id: int, tile_coord: TileCoordinate):
+    """Re-fetch a stale cached tile in the background"""
+    try:
+        transformer = transformer_for(endpoint_id)
+        client = client_for(endpoint_id)
+        transformed_coords = await transformer.transform_tile(tile_coord)
+        await _fetch_coalesced(cache_key, client, transformed_coords)
+    except Exception as e:
+        logger.warning("Background refresh failed for tile %d/%d/%d: %s", tile_coord.z, tile_coord.x, tile_coord.y, e)
+    finally:
+        refreshing_tiles.pop(cache_key, None)
+
+
+@app.on_event("startup")
+async def create_http_client():
+    """Create one pooled HTTP/2 client shared by all WMTS endpoints and capabilities fetches"""
+    app.state.http = httpx.AsyncClient(
+        timeout=30.0,
+        http2=True,
+        limits=httpx.Limits(
+            max_connections=settings.MAX_CONNECTIONS,
+            max_keepalive_connections=64
+        )
+    )
+    use_capabilities_client(app.state.http)
+
+
+@app.on_event("startup")
+async def warm_endpoints():
+    """Build transformers and clients up front so requests only do lookups"""
+    async def warm(name: str):
+        try:
+            get_client(name)
+            await get_transformer(name).load_wmts_parameters()
+        except Exception as e:
+            # Requests will retry the lazy initialization
+            logger.warning(f"Failed to warm endpoint {name}: {e}")
+    
+    await asyncio.gather(*(warm(name) for name in settings.WMTS_ENDPOINTS))
+
+
+@app.on_event("startup")
+async def start_metrics_drain():
+    global metrics_queue
+    # Created here rather than at import so the queue belongs to the serving event loop
+    metrics_queue = asyncio.Queue(maxsize=10000)
+    app.state.metrics_task = asyncio.create_task(_drain_metrics(metrics_queue))
+
+
+@app.on_event("shutdown")
+async def close_http_client():
+    await close_capabilities_client()
+    await app.state.http.aclose()
+
+
+@app.on_event("shutdown")
+async def close_crs_client():
+    await close_crs_fetcher()
+
+
+@app.on_event("shutdown")
+async def stop_metrics_drain():
+    app.state.metrics_task.cancel()
 
 
 @app.get("/")
 async def root():
-    return {
-        "message": "MapMap Tile Proxy", 
-        "version": "1.0.0",
-        "endpoints": list(settings.WMTS_ENDPOINTS.keys()),
-        "coordinate_systems": list_coordinate_systems()
-    }
+    return Response(content=ROOT_JSON, media_type="application/json")
 
 
 @app.post("/cache/clear")
 async def clear_cache():
     """Clear all caches including transformers and tiles"""
-    global transformers, clients, tile_cache
-    transformers.clear()
-    clients.clear()
+    transformers[:] = [None] * len(endpoint_names)
+    clients[:] = [None] * len(endpoint_names)
     tile_cache.clear()
+    out_of_bounds_tiles.clear()
     return {"message": "All caches cleared"}
 
 
@@ -138,16 +328,19 @@ async def get_bounds(endpoint: Optional[str] = None):
 
 @app.middleware("http")
 async def add_metrics_middleware(request: Request, call_next):
-    start_time = time.time()
+    start_ns = time.monotonic_ns()
     
     response = await call_next(request)
     
     # Record metrics
-    duration = time.time() - start_time
-    endpoint = request.url.path.split('/')[1] if len(request.url.path.split('/')) > 1 else "root"
+    duration = (time.monotonic_ns() - start_ns) / 1e9
+    endpoint = request.scope["path"].split('/', 2)[1]
     
-    REQUEST_COUNT.labels(endpoint=endpoint, method=request.method, status=response.status_code).inc()
-    REQUEST_DURATION.labels(endpoint=endpoint).observe(duration)
+    if metrics_queue is not None:
+        try:
+            metrics_queue.put_nowait((endpoint, request.method, response.status_code, duration))
+        except asyncio.QueueFull:
+            pass  # Drop samples rather than slow down requests
     
     return response
 
@@ -165,46 +358,51 @@ async def get_tile(
         # Validate coordinates first
         if z < 0 or x < 0 or y < 0:
             raise HTTPException(status_code=400, detail="Tile coordinates must be non-negative")
+        # Reject tiles outside the pyramid up front; this also keeps the packed cache key fields in range.
+        # Zoom is range-checked before it is used as a shift count
+        if not 0 <= z <= MAX_TILE_ZOOM or x >> z or y >> z:
+            raise HTTPException(status_code=400, detail="Tile coordinates out of bounds")
             
         endpoint_name = endpoint or settings.DEFAULT_ENDPOINT
-        cache_key = f"{endpoint_name}-{z}-{x}-{y}"
+        endpoint_id = get_endpoint_id(endpoint_name)
+        cache_key = make_tile_key(endpoint_id, z, x, y)
         
-        if cache_key in tile_cache:
+        cached = tile_cache.get(cache_key)
+        if cached is not None:
+            cached_tile, etag, is_stale = cached
             TILE_CACHE_HITS.inc()
-            logger.debug(f"Cache hit for tile {z}/{x}/{y} from {endpoint_name}")
-            return Response(content=tile_cache[cache_key], media_type="image/png")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Cache hit for tile %d/%d/%d from %s", z, x, y, endpoint_name)
+            if is_stale and cache_key not in refreshing_tiles:
+                refreshing_tiles[cache_key] = asyncio.create_task(
+                    _refresh_tile(cache_key, endpoint_id, TileCoordinate(z=z, x=x, y=y))
+                )
+            return tile_response(request, cached_tile, etag, is_stale)
+        
+        if cache_key in out_of_bounds_tiles:
+            return out_of_bounds_response()
         
         TILE_CACHE_MISSES.inc()
         
         tile_coord = TileCoordinate(z=z, x=x, y=y)
         
-        transformer = get_transformer(endpoint_name)
-        client = get_client(endpoint_name)
+        transformer = transformer_for(endpoint_id)
+        client = client_for(endpoint_id)
         
-        if not await transformer.is_valid_tile(tile_coord):
-            raise HTTPException(status_code=400, detail="Tile coordinates out of bounds")
+        # Transform once; tiles outside the WMTS server coverage get a transparent PNG
+        transformed_coords = await transformer.transform_in_bounds(tile_coord)
+        if transformed_coords is None:
+            logger.warning("Tile %d/%d/%d is outside WMTS server bounds", z, x, y)
+            # Remember the verdict only once the tile matrix geometry is final
+            if transformer.is_initialized:
+                out_of_bounds_tiles.add(cache_key)
+            return out_of_bounds_response()
         
-        transformed_coords = await transformer.transform_tile(tile_coord)
+        fetched = await _fetch_coalesced(cache_key, client, transformed_coords)
         
-        # Check if transformed coordinates are in the valid range for WMTS server
-        # Skip bounds check for WebMercatorQuad as it uses different validation
-        endpoint_config = settings.get_endpoint(endpoint_name)
-        if endpoint_config.coordinate_system != "WebMercatorQuad":
-            from tile_matrix_limits import is_tile_in_bounds
-            zoom_level = int(transformed_coords.tile_matrix.split(":")[1])
-            
-            if not is_tile_in_bounds(zoom_level, transformed_coords.tile_col, transformed_coords.tile_row):
-                logger.warning(f"Transformed tile {transformed_coords.tile_matrix}/{transformed_coords.tile_col}/{transformed_coords.tile_row} is outside WMTS server bounds")
-                # Return a 1x1 transparent PNG instead of making the request
-                import base64
-                transparent_png = base64.b64decode("iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42mNkYAAAAAYAAjCB0C8AAAAASUVORK5CYII=")
-                return Response(content=transparent_png, media_type="image/png")
-        
-        tile_data = await client.fetch_tile(transformed_coords)
-        
-        if tile_data:
-            tile_cache[cache_key] = tile_data
-            return Response(content=tile_data, media_type="image/png")
+        if fetched:
+            tile_data, etag = fetched
+            return tile_response(request, tile_data, etag)
         else:
             raise HTTPException(status_code=404, detail="Tile not found")
             
@@ -212,30 +410,26 @@ async def get_tile(
         # Re-raise HTTP exceptions as-is
         raise
     except Exception as e:
-        logger.error(f"Error fetching tile {z}/{x}/{y}: {str(e)}")
+        logger.error("Error fetching tile %d/%d/%d: %s", z, x, y, e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/coordinate-systems")
 async def get_coordinate_systems():
-    return list_coordinate_systems()
+    return Response(content=COORDINATE_SYSTEMS_JSON, media_type="application/json")
 
 
 @app.get("/endpoints")
 async def get_endpoints():
-    endpoints = {}
-    for name, config in settings.WMTS_ENDPOINTS.items():
-        endpoints[name] = {
-            "url": config["url"],
-            "layer": config["layer"],
-            "coordinate_system": config["coordinate_system"]
-        }
-    return endpoints
+    return Response(content=ENDPOINTS_JSON, media_type="application/json")
 
 
 @app.get("/debug/{z}/{x}/{y}")
 async def debug_tile(z: int, x: int, y: int):
     """Debug endpoint to show coordinate transformation without making WMTS request"""
+    if z < 0 or z > MAX_TILE_ZOOM or x < 0 or y < 0 or x >> z or y >> z:
+        raise HTTPException(status_code=400, detail="Tile coordinates out of bounds")
+    
     try:
         tile_coord = TileCoordinate(z=z, x=x, y=y)
         transformer = get_transformer("latvia")
@@ -268,6 +462,7 @@ async def health_check():
     return {
         "status": "healthy", 
         "cache_size": len(tile_cache),
+        "cache_bytes": tile_cache.current_bytes,
         "version": "1.0.0",
         "timestamp": time.time()
     }
@@ -297,4 +492,12 @@ async def readiness_check():
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    # uvloop and httptools ship with uvicorn[standard]; workers need an import string
+    uvicorn.run(
+        "app:app",
+        host="0.0.0.0",
+        port=8000,
+        loop="uvloop",
+        http="httptools",
+        workers=settings.WORKERS
+    )
\ No newline at end of file
@@ -6,13 +6,16 @@ caching settings, and environment variable loading. Supports both
 Web Mercator and coordinate transformation endpoints.
 """
 
+from dataclasses import dataclass
+from pydantic import PrivateAttr
 from pydantic_settings import BaseSettings
 from typing import Optional, Dict, Any, List
 import json
 import os
 
 
-class WMTSEndpoint(BaseSettings):
+@dataclass(frozen=True, slots=True)
+class WMTSEndpoint:
     url: str
     layer: str
     coordinate_system: str
@@ -45,6 +48,13 @@ class Settings(BaseSettings):
     
     CACHE_SIZE: int = 1000
     CACHE_TTL: int = 3600
+    CACHE_GRACE_TTL: int = 300
+    CACHE_BYTES: int = 256 * 1024 * 1024
+    # Persistent cache of EPSG definitions from spatialreference.org. Disabled when
+    # empty; point it at a writable volume, as the container root filesystem is read-only
+    CRS_CACHE_FILE: str = ""
+    # Number of CRS definitions kept in memory
+    CRS_CACHE_SIZE: int = 256
     
     LOG_LEVEL: str = "INFO"
     
@@ -67,6 +77,9 @@ class Settings(BaseSettings):
     RATE_LIMIT_REQUESTS: int = 100
     RATE_LIMIT_WINDOW: int = 3600
     
+    # Endpoint configs keyed by name, built once from WMTS_ENDPOINTS
+    _endpoint_table: Dict[str, WMTSEndpoint] = PrivateAttr(default_factory=dict)
+    
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
@@ -77,14 +90,20 @@ class Settings(BaseSettings):
                 return json.loads(raw_val)
             return cls.json_loads(raw_val)
     
+    def model_post_init(self, __context: Any) -> None:
+        self._endpoint_table = {
+            name: WMTSEndpoint(**endpoint_data)
+            for name, endpoint_data in self.WMTS_ENDPOINTS.items()
+        }
+    
     def get_endpoint(self, name: Optional[str] = None) -> WMTSEndpoint:
         endpoint_name = name or self.DEFAULT_ENDPOINT
-        endpoint_data = self.WMTS_ENDPOINTS.get(endpoint_name)
+        endpoint = self._endpoint_table.get(endpoint_name)
         
-        if not endpoint_data:
+        if endpoint is None:
             raise ValueError(f"Unknown endpoint: {endpoint_name}")
         
-        return WMTSEndpoint(**endpoint_data)
+        return endpoint
     
     def get_allowed_origins(self) -> List[str]:
         """Parse ALLOWED_ORIGINS into a list"""
@@ -6,7 +6,7 @@ LKS_LVM (Latvia), WebMercatorQuad, and other EPSG systems. Provides both dynamic
 WMTS-based configurations and static fallback configurations.
 """
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Dict, Optional, Tuple
 from pyproj import CRS
 import asyncio
@@ -28,6 +28,11 @@ class CoordinateSystemConfig:
     epsg: Optional[int] = None
     origin: Optional[Tuple[float, float]] = None
     tile_matrix_scales: Optional[Dict[int, float]] = None
+    # Flattened (min_lon, min_lat, max_lon, max_lat, min_zoom, max_zoom), derived once
+    limits: Tuple[float, float, float, float, int, int] = field(init=False, repr=False)
+    
+    def __post_init__(self):
+        self.limits = (*self.bounds, self.min_zoom, self.max_zoom)
 
 
 COORDINATE_SYSTEMS = {
@@ -8,25 +8,150 @@ WebMercatorQuad and complex transformations for local coordinate systems.
 
 import math
 import asyncio
+import functools
+from collections import OrderedDict
 from dataclasses import dataclass
+import numpy as np
 from pyproj import Transformer, CRS
 import logging
-from typing import Optional
+from typing import Optional, Union, Tuple, Dict
 from coordinate_systems import CoordinateSystemConfig, get_coordinate_system
 from wmts_capabilities import get_tile_matrix_set, get_layer_info, get_wmts_info, TileMatrixSet, LayerInfo
-from crs_fetcher import get_crs_info, get_proj4_string, get_wkt_string
+from crs_fetcher import get_wkt_string, get_crs_definitions
+from tile_matrix_limits import is_tile_in_bounds
 
 logger = logging.getLogger(__name__)
 
+# Deepest Web Mercator zoom level accepted for incoming tiles
+MAX_TILE_ZOOM = 20
 
-@dataclass
+
+# Number of transformed tile coordinates memoized per transformer
+TRANSFORM_MEMO_SIZE = 16384
+
+# Degrees added around the layer's WGS84 bounding box before tiles are rejected
+# on it, so the pre-check never drops a tile the tile matrix limits would serve
+COVERAGE_PADDING_DEG = 0.5
+
+# WebMercatorQuad tile matrix identifiers are plain zoom levels
+_WEBMERCATOR_MATRIX_IDS = tuple(str(z) for z in range(MAX_TILE_ZOOM + 1))
+
+
+@functools.lru_cache(maxsize=4096)
+def _tile_y_to_lat(z: int, y: int) -> float:
+    """Latitude of the top edge of Web Mercator tile row ``y`` at zoom ``z``"""
+    return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / (1 << z)))))
+
+
+# Batches at least this large are transformed on a worker thread. pyproj (>= 3.1)
+# releases the GIL for array input, so big batches don't stall the event loop.
+EXECUTOR_TRANSFORM_THRESHOLD = 1024
+
+
+async def _batch_transform(transformer: Transformer, xs, ys):
+    """Transform coordinate sequences, offloading large batches to the default executor"""
+    if len(xs) < EXECUTOR_TRANSFORM_THRESHOLD:
+        return transformer.transform(xs, ys)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, transformer.transform, xs, ys)
+
+
+def _tile_bbox(z: int, x: int, y: int) -> Tuple[float, float, float, float]:
+    """WGS84 bounds of a Web Mercator tile as (min_lon, min_lat, max_lon, max_lat)"""
+    n = float(1 << z)
+    return (
+        x / n * 360.0 - 180.0,
+        _tile_y_to_lat(z, y + 1),
+        (x + 1) / n * 360.0 - 180.0,
+        _tile_y_to_lat(z, y)
+    )
+
+
+def _wmts_tile_and_quadrant(center_x: float, center_y: float,
+                            origin_x: float, origin_y: float,
+                            wmts_tile_size_x: float, wmts_tile_size_y: float,
+                            tiles_per_wmts_tile: int) -> Tuple[int, int, int, int]:
+    """WMTS tile column/row containing a target CRS point, and the Leaflet
+    quadrant of that tile the point falls in (0,0 = top-left)"""
+    # Calculate WMTS tile coordinates using center point
+    wmts_tile_col = int((center_x - origin_x) / wmts_tile_size_x)
+    wmts_tile_row = int((origin_y - center_y) / wmts_tile_size_y)
+    
+    # Position of the center relative to the WMTS tile's top-left corner
+    relative_x = center_x - (origin_x + wmts_tile_col * wmts_tile_size_x)
+    relative_y = (origin_y - wmts_tile_row * wmts_tile_size_y) - center_y
+    
+    if tiles_per_wmts_tile == 2:
+        # 512px WMTS tiles: the quadrant is just which half the center falls in
+        quadrant_x = 1 if relative_x * 2 >= wmts_tile_size_x else 0
+        quadrant_y = 1 if relative_y * 2 >= wmts_tile_size_y else 0
+    else:
+        quadrant_x = int(relative_x / (wmts_tile_size_x / tiles_per_wmts_tile))
+        quadrant_y = int(relative_y / (wmts_tile_size_y / tiles_per_wmts_tile))
+        
+        # Ensure quadrants are within bounds
+        quadrant_x = max(0, min(tiles_per_wmts_tile - 1, quadrant_x))
+        quadrant_y = max(0, min(tiles_per_wmts_tile - 1, quadrant_y))
+    
+    return wmts_tile_col, wmts_tile_row, quadrant_x, quadrant_y
+
+
+def tiles_to_bboxes_wgs84(zs: np.ndarray, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+    """Vectorized tile_to_bbox_wgs84 for many tiles at once
+    
+    Inputs broadcast against each other, so a single zoom can be given as a scalar.
+    Returns an (N, 4) float64 array of min_lon, min_lat, max_lon, max_lat rows.
+    """
+    zs, xs, ys = np.broadcast_arrays(
+        np.asarray(zs, dtype=np.float64),
+        np.asarray(xs, dtype=np.float64),
+        np.asarray(ys, dtype=np.float64)
+    )
+    n = np.exp2(zs).ravel()
+    xs = xs.ravel()
+    ys = ys.ravel()
+    
+    bboxes = np.empty((n.shape[0], 4), dtype=np.float64)
+    bboxes[:, 0] = xs / n * 360.0 - 180.0
+    bboxes[:, 1] = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * (ys + 1) / n))))
+    bboxes[:, 2] = (xs + 1) / n * 360.0 - 180.0
+    bboxes[:, 3] = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * ys / n))))
+    return bboxes
+
+
+# CRS and Transformer construction dominates transform cost, so both are built once
+# per definition. Definitions are EPSG codes or Proj4 strings since CRS isn't hashable.
+@functools.lru_cache(maxsize=256)
+def _crs_from_epsg(epsg_code: int) -> CRS:
+    return CRS.from_epsg(epsg_code)
+
+
+@functools.lru_cache(maxsize=256)
+def _crs_from_proj4(proj4_str: str) -> CRS:
+    return CRS.from_proj4(proj4_str)
+
+
+def _crs_from_definition(definition: Union[int, str]) -> CRS:
+    if isinstance(definition, int):
+        return _crs_from_epsg(definition)
+    return _crs_from_proj4(definition)
+
+
+@functools.lru_cache(maxsize=256)
+def _cached_transformer(source: Union[int, str], target: Union[int, str]) -> Transformer:
+    return Transformer.from_crs(
+        _crs_from_definition(source), _crs_from_definition(target), always_xy=True
+    )
+
+
+@dataclass(frozen=True, slots=True)
 class TileCoordinate:
     z: int
     x: int
     y: int
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class BoundingBox:
     min_lon: float
     min_lat: float
@@ -34,9 +159,10 @@ class BoundingBox:
     max_lat: float
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class TransformedTileCoordinate:
     tile_matrix: str
+    tile_matrix_zoom: int
     tile_col: int
     tile_row: int
     quadrant_x: int = 0  # 0 = left, 1 = right
@@ -50,6 +176,9 @@ class CoordinateTransformer:
         if not self.target_system_config:
             raise ValueError(f"Unknown coordinate system: {target_system}")
         
+        # WebMercatorQuad tiles pass straight through, so no CRS objects are ever built
+        self._passthrough = target_system == "WebMercatorQuad"
+        
         # CRS objects will be initialized dynamically
         self.wgs84_crs: Optional[CRS] = None
         self.target_crs: Optional[CRS] = None
@@ -57,19 +186,47 @@ class CoordinateTransformer:
         self.transformer_to_wgs84: Optional[Transformer] = None
         
         # Bounds will be updated from WMTS layer info
+        min_lon, min_lat, max_lon, max_lat, min_zoom, max_zoom = self.target_system_config.limits
         self.bounds = BoundingBox(
-            min_lon=self.target_system_config.bounds[0],
-            min_lat=self.target_system_config.bounds[1],
-            max_lon=self.target_system_config.bounds[2],
-            max_lat=self.target_system_config.bounds[3]
+            min_lon=min_lon,
+            min_lat=min_lat,
+            max_lon=max_lon,
+            max_lat=max_lat
         )
         
+        # Tile matrix identifiers for every supported zoom, indexed by zoom - min_zoom
+        prefix = self.target_system_config.tile_matrix_prefix
+        self._tile_matrix_ids = [f"{prefix}:{z}" for z in range(min_zoom, max_zoom + 1)]
+        
         self.tile_size = 256
         self.tile_matrix_set: Optional[TileMatrixSet] = None
         self.layer_info: Optional[LayerInfo] = None
+        
+        # Padded WGS84 box of the layer's real coverage, used to reject tiles
+        # before transforming them; None until known, which disables the check
+        self._coverage_bounds: Optional[BoundingBox] = None
+        
+        # Set once parameters and transformers are loaded; concurrent first
+        # requests all wait on the same initialization task
+        self._init_event = asyncio.Event()
+        self._init_task: Optional[asyncio.Task] = None
+        
+        # LRU of transform_tile results keyed by (z, x, y); only filled once
+        # parameters are final so fallback results are never memoized
+        self._transform_memo: "OrderedDict[Tuple[int, int, int], TransformedTileCoordinate]" = OrderedDict()
+        self._geometry_by_zoom: Dict[int, Tuple[float, float, float, float, int]] = {}
     
     async def load_wmts_parameters(self):
         """Load tile matrix parameters and CRS info from WMTS capabilities and spatialreference.org"""
+        if self._init_event.is_set():
+            return
+        
+        # A finished task with the event still clear means loading failed, so retry
+        if self._init_task is None or self._init_task.done():
+            self._init_task = asyncio.create_task(self._do_init())
+        await asyncio.shield(self._init_task)
+    
+    async def _do_init(self):
         if (self.target_system_config.wmts_url and 
             self.target_system_config.tile_matrix_set_id and 
             not self.tile_matrix_set):
@@ -103,17 +260,36 @@ class CoordinateTransformer:
                             max_lat=self.layer_info.wgs84_bounding_box[3]
                         )
                         logger.info(f"Updated bounds from WMTS layer: {self.bounds}")
+                    
+                    layer_min_lon, layer_min_lat, layer_max_lon, layer_max_lat = self.layer_info.wgs84_bounding_box
+                    self._coverage_bounds = BoundingBox(
+                        min_lon=layer_min_lon - COVERAGE_PADDING_DEG,
+                        min_lat=layer_min_lat - COVERAGE_PADDING_DEG,
+                        max_lon=layer_max_lon + COVERAGE_PADDING_DEG,
+                        max_lat=layer_max_lat + COVERAGE_PADDING_DEG
+                    )
                 
                 # Initialize CRS objects dynamically
-                await self._initialize_crs()
+                if not self._passthrough:
+                    await self._initialize_crs()
             else:
                 logger.warning(f"Failed to load WMTS parameters for {self.target_system_config.name}")
+        
+        # Transformers fall back to the configured EPSG code if capabilities are unavailable
+        if not self._passthrough and not self.transformer_to_target:
+            await self._initialize_crs()
+        
+        if self.tile_matrix_set or not (self.target_system_config.wmts_url and
+                                        self.target_system_config.tile_matrix_set_id):
+            self._transform_memo.clear()
+            self._geometry_by_zoom.clear()
+            self._init_event.set()
     
     async def _initialize_crs(self):
         """Initialize CRS objects using dynamic EPSG fetching"""
         try:
             # Always use WGS84 as source
-            self.wgs84_crs = CRS.from_epsg(4326)
+            self.wgs84_crs = _crs_from_epsg(4326)
             
             # Get target EPSG from WMTS or config
             target_epsg = None
@@ -126,49 +302,43 @@ class CoordinateTransformer:
             else:
                 raise ValueError("No EPSG code available for target CRS")
             
-            # Fetch CRS info from spatialreference.org
-            crs_info = await get_crs_info(target_epsg)
+            # Fetch Proj4 and CRS info from spatialreference.org in parallel
+            proj4_str, crs_info = await get_crs_definitions(target_epsg)
             if crs_info:
                 logger.info(f"Fetched CRS info from spatialreference.org: {crs_info.name}")
             
             # Try to create CRS from spatialreference.org data, fallback to EPSG
+            target_definition: Union[int, str] = target_epsg
             try:
                 # First try with Proj4 string if available
-                proj4_str = await get_proj4_string(target_epsg)
                 if proj4_str:
-                    self.target_crs = CRS.from_proj4(proj4_str)
+                    self.target_crs = _crs_from_proj4(proj4_str)
+                    target_definition = proj4_str
                     logger.info(f"Created target CRS from Proj4: {proj4_str}")
                 else:
                     # Fallback to EPSG code
-                    self.target_crs = CRS.from_epsg(target_epsg)
+                    self.target_crs = _crs_from_epsg(target_epsg)
                     logger.info(f"Created target CRS from EPSG: {target_epsg}")
             except Exception as e:
                 logger.warning(f"Failed to create CRS from spatialreference.org data: {e}")
                 # Final fallback to EPSG
-                self.target_crs = CRS.from_epsg(target_epsg)
+                self.target_crs = _crs_from_epsg(target_epsg)
                 logger.info(f"Using fallback EPSG CRS: {target_epsg}")
             
             # Create transformers
-            self.transformer_to_target = Transformer.from_crs(
-                self.wgs84_crs, self.target_crs, always_xy=True
-            )
-            self.transformer_to_wgs84 = Transformer.from_crs(
-                self.target_crs, self.wgs84_crs, always_xy=True
-            )
+            self.transformer_to_target = _cached_transformer(4326, target_definition)
+            self.transformer_to_wgs84 = _cached_transformer(target_definition, 4326)
             
             logger.info(f"Initialized CRS transformers: WGS84 <-> {self.target_crs.to_string()}")
             
         except Exception as e:
             logger.error(f"Failed to initialize CRS: {e}")
             # Emergency fallback
-            self.wgs84_crs = CRS.from_epsg(4326)
-            self.target_crs = CRS.from_epsg(self.target_system_config.epsg or 3059)
-            self.transformer_to_target = Transformer.from_crs(
-                self.wgs84_crs, self.target_crs, always_xy=True
-            )
-            self.transformer_to_wgs84 = Transformer.from_crs(
-                self.target_crs, self.wgs84_crs, always_xy=True
-            )
+            fallback_epsg = self.target_system_config.epsg or 3059
+            self.wgs84_crs = _crs_from_epsg(4326)
+            self.target_crs = _crs_from_epsg(fallback_epsg)
+            self.transformer_to_target = _cached_transformer(4326, fallback_epsg)
+            self.transformer_to_wgs84 = _cached_transformer(fallback_epsg, 4326)
     
     def get_tile_matrix(self, zoom_level: int):
         """Get tile matrix for zoom level, with fallback to static parameters"""
@@ -177,16 +347,7 @@ class CoordinateTransformer:
         return None
     
     def tile_to_bbox_wgs84(self, tile: TileCoordinate) -> BoundingBox:
-        n = 2.0 ** tile.z
-        lon_min = tile.x / n * 360.0 - 180.0
-        lon_max = (tile.x + 1) / n * 360.0 - 180.0
-        
-        lat_max_rad = math.atan(math.sinh(math.pi * (1 - 2 * tile.y / n)))
-        lat_max = math.degrees(lat_max_rad)
-        
-        lat_min_rad = math.atan(math.sinh(math.pi * (1 - 2 * (tile.y + 1) / n)))
-        lat_min = math.degrees(lat_min_rad)
-        
+        lon_min, lat_min, lon_max, lat_max = _tile_bbox(tile.z, tile.x, tile.y)
         return BoundingBox(
             min_lon=lon_min,
             min_lat=lat_min,
@@ -194,28 +355,15 @@ class CoordinateTransformer:
             max_lat=lat_max
         )
     
-    async def transform_tile(self, tile: TileCoordinate) -> TransformedTileCoordinate:
-        # Special case: WebMercatorQuad uses direct tile coordinates (no transformation)
-        if self.target_system_config.name == "WebMercatorQuad":
-            tile_matrix_id = str(tile.z)  # WebMercator uses simple zoom levels
-            return TransformedTileCoordinate(
-                tile_matrix=tile_matrix_id,
-                tile_col=tile.x,
-                tile_row=tile.y,
-                quadrant_x=0,
-                quadrant_y=0
-            )
+    def _zoom_geometry(self, zoom_level: int) -> Tuple[float, float, float, float, int]:
+        """WMTS tile geometry for a zoom level
         
-        # Ensure WMTS parameters are loaded
-        await self.load_wmts_parameters()
-        
-        # Ensure transformers are initialized
-        if not self.transformer_to_target:
-            await self._initialize_crs()
-        
-        zoom_level = min(tile.z, self.target_system_config.max_zoom)
-        if zoom_level < self.target_system_config.min_zoom:
-            zoom_level = self.target_system_config.min_zoom
+        Returns origin x/y and WMTS tile extent x/y in target CRS units, and the
+        number of Leaflet tiles per WMTS tile edge.
+        """
+        geometry = self._geometry_by_zoom.get(zoom_level)
+        if geometry is not None:
+            return geometry
         
         # Get tile matrix from WMTS or fallback to static parameters
         tile_matrix = self.get_tile_matrix(zoom_level)
@@ -230,7 +378,8 @@ class CoordinateTransformer:
             # WMTS standard: pixel size = scale_denominator * 0.00028 (meters per pixel)
             wmts_pixel_size = scale_denominator * 0.00028
             
-            logger.info(f"Using WMTS parameters: scale={scale_denominator}, origin=({origin_x}, {origin_y}), tile_size={wmts_tile_width}x{wmts_tile_height}")
+            logger.info("Using WMTS parameters: scale=%s, origin=(%s, %s), tile_size=%sx%s",
+                        scale_denominator, origin_x, origin_y, wmts_tile_width, wmts_tile_height)
         else:
             # Fallback to static parameters
             if self.target_system_config.tile_matrix_scales:
@@ -246,94 +395,133 @@ class CoordinateTransformer:
             wmts_tile_width = 512
             wmts_tile_height = 512
             
-            logger.warning(f"Using fallback parameters for zoom {zoom_level}")
+            logger.warning("Using fallback parameters for zoom %s", zoom_level)
         
-        # Calculate the bounds of the Leaflet tile in WGS84
-        bbox_wgs84 = self.tile_to_bbox_wgs84(tile)
-        
-        # Transform the four corners to target coordinate system
-        corners_wgs84 = [
-            (bbox_wgs84.min_lon, bbox_wgs84.max_lat),  # top-left
-            (bbox_wgs84.max_lon, bbox_wgs84.max_lat),  # top-right
-            (bbox_wgs84.min_lon, bbox_wgs84.min_lat),  # bottom-left
-            (bbox_wgs84.max_lon, bbox_wgs84.min_lat),  # bottom-right
-        ]
-        
-        corners_target = []
-        for lon, lat in corners_wgs84:
-            x, y = self.transformer_to_target.transform(lon, lat)
-            corners_target.append((x, y))
-        
-        # Find the bounding box in target coordinates
-        min_x = min(x for x, y in corners_target)
-        max_x = max(x for x, y in corners_target)
-        min_y = min(y for x, y in corners_target)
-        max_y = max(y for x, y in corners_target)
-        
-        # Calculate center in target coordinates
-        center_x = (min_x + max_x) / 2
-        center_y = (min_y + max_y) / 2
-        
-        # Calculate WMTS tile coordinates using center point
         # Each WMTS tile covers wmts_tile_width x wmts_tile_height pixels
         wmts_tile_size_x = wmts_tile_width * wmts_pixel_size
         wmts_tile_size_y = wmts_tile_height * wmts_pixel_size
         
-        wmts_tile_col = int((center_x - origin_x) / wmts_tile_size_x)
-        wmts_tile_row = int((origin_y - center_y) / wmts_tile_size_y)
-        
-        # Calculate which quadrant of the WMTS tile this Leaflet tile represents
         # Each WMTS tile (512x512) contains 4 Leaflet tiles (256x256) in a 2x2 grid
         tiles_per_wmts_tile = wmts_tile_width // 256
         
-        # Calculate position within the WMTS tile
-        wmts_tile_left = origin_x + wmts_tile_col * wmts_tile_size_x
-        wmts_tile_top = origin_y - wmts_tile_row * wmts_tile_size_y
+        geometry = (origin_x, origin_y, wmts_tile_size_x, wmts_tile_size_y, tiles_per_wmts_tile)
+        
+        # Only keep geometry derived from final parameters, like the transform memo
+        if self._init_event.is_set():
+            self._geometry_by_zoom[zoom_level] = geometry
+        
+        return geometry
+    
+    async def transform_tile(self, tile: TileCoordinate) -> TransformedTileCoordinate:
+        # Special case: WebMercatorQuad uses direct tile coordinates (no transformation)
+        if self._passthrough:
+            # WebMercator uses simple zoom levels
+            tile_matrix_id = _WEBMERCATOR_MATRIX_IDS[tile.z] if tile.z <= MAX_TILE_ZOOM else str(tile.z)
+            return TransformedTileCoordinate(
+                tile_matrix=tile_matrix_id,
+                tile_matrix_zoom=tile.z,
+                tile_col=tile.x,
+                tile_row=tile.y,
+                quadrant_x=0,
+                quadrant_y=0
+            )
+        
+        # Ensure WMTS parameters and transformers are loaded
+        if not self._init_event.is_set():
+            await self.load_wmts_parameters()
         
-        # Position of this Leaflet tile's center relative to WMTS tile origin
-        relative_x = center_x - wmts_tile_left
-        relative_y = wmts_tile_top - center_y
+        z, x, y = tile.z, tile.x, tile.y
+        memo_key = (z, x, y)
+        memo = self._transform_memo
+        cached = memo.get(memo_key)
+        if cached is not None:
+            memo.move_to_end(memo_key)
+            return cached
         
-        # Calculate quadrant (0,0 = top-left, 1,1 = bottom-right)
-        leaflet_tile_size_x = wmts_tile_size_x / tiles_per_wmts_tile
-        leaflet_tile_size_y = wmts_tile_size_y / tiles_per_wmts_tile
+        _, _, _, _, min_zoom, max_zoom = self.target_system_config.limits
+        zoom_level = max(min_zoom, min(z, max_zoom))
         
-        quadrant_x = int(relative_x / leaflet_tile_size_x)
-        quadrant_y = int(relative_y / leaflet_tile_size_y)
+        (origin_x, origin_y, wmts_tile_size_x, wmts_tile_size_y,
+         tiles_per_wmts_tile) = self._zoom_geometry(zoom_level)
         
-        # Ensure quadrants are within bounds
-        quadrant_x = max(0, min(tiles_per_wmts_tile - 1, quadrant_x))
-        quadrant_y = max(0, min(tiles_per_wmts_tile - 1, quadrant_y))
+        # Calculate the bounds of the Leaflet tile in WGS84
+        min_lon, min_lat, max_lon, max_lat = _tile_bbox(z, x, y)
+        
+        # Transform the four corners (top-left, top-right, bottom-left, bottom-right)
+        # to the target coordinate system in a single batched call
+        xs, ys = await _batch_transform(
+            self.transformer_to_target,
+            [min_lon, max_lon, min_lon, max_lon],
+            [max_lat, max_lat, min_lat, min_lat],
+        )
         
-        tile_matrix_id = f"{self.target_system_config.tile_matrix_prefix}:{zoom_level}"
+        # Center of the tile's bounding box in target coordinates
+        center_x = (min(xs) + max(xs)) / 2
+        center_y = (min(ys) + max(ys)) / 2
         
-        logger.info(f"Transformed WGS84 tile {tile.z}/{tile.x}/{tile.y} -> center ({center_x:.2f}, {center_y:.2f}) -> WMTS {tile_matrix_id}/{wmts_tile_col}/{wmts_tile_row} quadrant ({quadrant_x},{quadrant_y})")
+        wmts_tile_col, wmts_tile_row, quadrant_x, quadrant_y = _wmts_tile_and_quadrant(
+            center_x, center_y, origin_x, origin_y,
+            wmts_tile_size_x, wmts_tile_size_y, tiles_per_wmts_tile
+        )
+        
+        tile_matrix_id = self._tile_matrix_ids[zoom_level - min_zoom]
+        
+        logger.info("Transformed WGS84 tile %s/%s/%s -> center (%.2f, %.2f) -> WMTS %s/%s/%s quadrant (%s,%s)",
+                    z, x, y, center_x, center_y, tile_matrix_id,
+                    wmts_tile_col, wmts_tile_row, quadrant_x, quadrant_y)
         
-        return TransformedTileCoordinate(
+        transformed = TransformedTileCoordinate(
             tile_matrix=tile_matrix_id,
+            tile_matrix_zoom=zoom_level,
             tile_col=wmts_tile_col,
             tile_row=wmts_tile_row,
             quadrant_x=quadrant_x,
             quadrant_y=quadrant_y
         )
+        
+        if self._init_event.is_set():
+            memo[memo_key] = transformed
+            if len(memo) > TRANSFORM_MEMO_SIZE:
+                memo.popitem(last=False)
+        
+        return transformed
     
     def _calculate_pixel_size(self, zoom_level: int) -> float:
         return 156543.03392804062 / (2 ** zoom_level)
     
+    @property
+    def is_initialized(self) -> bool:
+        """Whether WMTS parameters are final, so bounds results won't change"""
+        return self._init_event.is_set()
+    
+    async def transform_in_bounds(self, tile: TileCoordinate) -> Optional[TransformedTileCoordinate]:
+        """Transform a tile, or return None if it falls outside the WMTS server coverage
+        
+        The tile itself must already be a valid Web Mercator tile.
+        """
+        if self._passthrough:
+            return await self.transform_tile(tile)
+        
+        # Loading provides the layer coverage used by the pre-check below
+        if not self._init_event.is_set():
+            await self.load_wmts_parameters()
+        
+        # Tiles that don't intersect the layer's coverage can be rejected without a transform
+        bounds = self._coverage_bounds
+        if bounds is not None:
+            min_lon, min_lat, max_lon, max_lat = _tile_bbox(tile.z, tile.x, tile.y)
+            if (max_lon < bounds.min_lon or min_lon > bounds.max_lon or
+                    max_lat < bounds.min_lat or min_lat > bounds.max_lat):
+                return None
+        
+        # Check against WMTS server bounds
+        transformed = await self.transform_tile(tile)
+        if not is_tile_in_bounds(transformed.tile_matrix_zoom, transformed.tile_col, transformed.tile_row):
+            return None
+        return transformed
+    
     async def is_valid_tile(self, tile: TileCoordinate) -> bool:
-        # For WebMercatorQuad, use standard Web Mercator validation
-        if self.target_system_config.name == "WebMercatorQuad":
-            if tile.z < 0 or tile.z > 20:
-                return False
-            max_tile = 2 ** tile.z
-            if tile.x < 0 or tile.x >= max_tile:
-                return False
-            if tile.y < 0 or tile.y >= max_tile:
-                return False
-            return True
-        
-        # For other coordinate systems, use LKS_LVM validation
-        if tile.z < 0 or tile.z > 20:
+        if tile.z < 0 or tile.z > MAX_TILE_ZOOM:
             return False
         
         max_tile = 2 ** tile.z
@@ -342,13 +530,8 @@ class CoordinateTransformer:
         if tile.y < 0 or tile.y >= max_tile:
             return False
         
-        # Check if the transformed coordinates would be valid
+        # For WebMercatorQuad that is all; other systems must also land inside the WMTS coverage
         try:
-            transformed = await self.transform_tile(tile)
-            zoom_level = int(transformed.tile_matrix.split(":")[1])
-            
-            # Check against WMTS server bounds
-            from tile_matrix_limits import is_tile_in_bounds
-            return is_tile_in_bounds(zoom_level, transformed.tile_col, transformed.tile_row)
+            return await self.transform_in_bounds(tile) is not None
         except:
             return False
\ No newline at end of file
@@ -4,12 +4,18 @@ CRS (Coordinate Reference System) Fetcher
 Fetches coordinate reference system information from spatialreference.org
 including Proj4 strings, WKT definitions, and metadata for EPSG codes.
 """
+import asyncio
 import httpx
 import logging
-from typing import Optional, Dict
-from dataclasses import dataclass
+import os
+import threading
+from cachetools import LRUCache
+from typing import Optional, Dict, Any, Tuple
+from dataclasses import dataclass, asdict
 import json
 
+from config import settings
+
 logger = logging.getLogger(__name__)
 
 @dataclass
@@ -28,6 +34,23 @@ class CRSFetcher:
     def __init__(self):
         self.base_url = "https://spatialreference.org"
         self.timeout = 30.0
+        self._client: Optional[httpx.AsyncClient] = None
+    
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Pooled HTTP/2 client, created on first use and reused for every fetch"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                http2=True,
+                limits=httpx.Limits(max_keepalive_connections=10)
+            )
+        return self._client
+    
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
         
     async def fetch_crs_info(self, epsg_code: int) -> Optional[CRSInfo]:
         """Fetch CRS information from spatialreference.org"""
@@ -35,15 +58,14 @@ class CRSFetcher:
             # Fetch JSON format for structured data
             json_url = f"{self.base_url}/ref/epsg/{epsg_code}/json/"
             
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(json_url)
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    return self._parse_crs_json(data, epsg_code)
-                else:
-                    logger.warning(f"Failed to fetch CRS info for EPSG:{epsg_code}, status: {response.status_code}")
-                    return None
+            response = await self.client.get(json_url)
+            
+            if response.status_code == 200:
+                data = response.json()
+                return self._parse_crs_json(data, epsg_code)
+            else:
+                logger.warning(f"Failed to fetch CRS info for EPSG:{epsg_code}, status: {response.status_code}")
+                return None
                     
         except Exception as e:
             logger.error(f"Error fetching CRS info for EPSG:{epsg_code}: {e}")
@@ -90,17 +112,16 @@ class CRSFetcher:
         try:
             proj4_url = f"{self.base_url}/ref/epsg/{epsg_code}/proj4/"
             
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(proj4_url)
-                
-                if response.status_code == 200:
-                    # Response is plain text Proj4 string
-                    proj4_str = response.text.strip()
-                    logger.info(f"Fetched Proj4 for EPSG:{epsg_code}: {proj4_str}")
-                    return proj4_str
-                else:
-                    logger.warning(f"Failed to fetch Proj4 for EPSG:{epsg_code}, status: {response.status_code}")
-                    return None
+            response = await self.client.get(proj4_url)
+            
+            if response.status_code == 200:
+                # Response is plain text Proj4 string
+                proj4_str = response.text.strip()
+                logger.info(f"Fetched Proj4 for EPSG:{epsg_code}: {proj4_str}")
+                return proj4_str
+            else:
+                logger.warning(f"Failed to fetch Proj4 for EPSG:{epsg_code}, status: {response.status_code}")
+                return None
                     
         except Exception as e:
             logger.error(f"Error fetching Proj4 for EPSG:{epsg_code}: {e}")
@@ -111,24 +132,78 @@ class CRSFetcher:
         try:
             wkt_url = f"{self.base_url}/ref/epsg/{epsg_code}/ogcwkt/"
             
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(wkt_url)
-                
-                if response.status_code == 200:
-                    # Response is plain text WKT string
-                    wkt_str = response.text.strip()
-                    logger.info(f"Fetched WKT for EPSG:{epsg_code}: {wkt_str[:100]}...")
-                    return wkt_str
-                else:
-                    logger.warning(f"Failed to fetch WKT for EPSG:{epsg_code}, status: {response.status_code}")
-                    return None
+            response = await self.client.get(wkt_url)
+            
+            if response.status_code == 200:
+                # Response is plain text WKT string
+                wkt_str = response.text.strip()
+                logger.info(f"Fetched WKT for EPSG:{epsg_code}: {wkt_str[:100]}...")
+                return wkt_str
+            else:
+                logger.warning(f"Failed to fetch WKT for EPSG:{epsg_code}, status: {response.status_code}")
+                return None
                     
         except Exception as e:
             logger.error(f"Error fetching WKT for EPSG:{epsg_code}: {e}")
             return None
 
-# Cache for CRS info to avoid repeated requests
-_crs_cache: Dict[int, CRSInfo] = {}
+# Cache for CRS info to avoid repeated requests. Bounded since WKT strings make
+# entries large; entries are only mutated between awaits, so no lock is needed.
+_crs_cache: LRUCache = LRUCache(maxsize=settings.CRS_CACHE_SIZE)
+
+# Shared fetcher so every lookup reuses one connection pool
+_default_fetcher = CRSFetcher()
+
+async def close_crs_fetcher():
+    """Close the shared fetcher's connection pool"""
+    await _default_fetcher.aclose()
+
+# EPSG definitions never change, so fetched values can also be persisted to
+# CRS_CACHE_FILE (disabled when empty) and survive restarts. The file is keyed
+# by EPSG code, then by "info", "proj4" or "wkt". It is only read on an LRU miss
+# and never mirrored in memory, so the LRU above stays the only in-memory copy.
+_disk_lock = threading.Lock()
+
+def _read_disk_cache(path: str) -> Dict[str, Dict[str, Any]]:
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable CRS cache {path}: {e}")
+        return {}
+
+def _read_disk_entry(path: str, epsg_code: int, field: str) -> Optional[Any]:
+    with _disk_lock:
+        return _read_disk_cache(path).get(str(epsg_code), {}).get(field)
+
+def _write_disk_entry(path: str, epsg_code: int, field: str, value: Any):
+    # Merge into whatever is on disk, so concurrent stores and other processes' entries survive
+    with _disk_lock:
+        cache = _read_disk_cache(path)
+        cache.setdefault(str(epsg_code), {})[field] = value
+        
+        # Write to a temporary file first so a crash never leaves a truncated cache
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(cache, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Failed to persist CRS cache to {path}: {e}")
+
+async def _disk_lookup(epsg_code: int, field: str) -> Optional[Any]:
+    path = settings.CRS_CACHE_FILE
+    if not path:
+        return None
+    return await asyncio.to_thread(_read_disk_entry, path, epsg_code, field)
+
+async def _disk_store(epsg_code: int, field: str, value: Any):
+    path = settings.CRS_CACHE_FILE
+    if not path:
+        return
+    await asyncio.to_thread(_write_disk_entry, path, epsg_code, field, value)
 
 async def get_crs_info(epsg_code: int) -> Optional[CRSInfo]:
     """Get CRS information with caching"""
@@ -136,11 +211,18 @@ async def get_crs_info(epsg_code: int) -> Optional[CRSInfo]:
         logger.info(f"Using cached CRS info for EPSG:{epsg_code}")
         return _crs_cache[epsg_code]
     
-    fetcher = CRSFetcher()
+    stored = await _disk_lookup(epsg_code, "info")
+    if stored:
+        crs_info = CRSInfo(**stored)
+        _crs_cache[epsg_code] = crs_info
+        return crs_info
+    
+    fetcher = _default_fetcher
     crs_info = await fetcher.fetch_crs_info(epsg_code)
     
     if crs_info:
         _crs_cache[epsg_code] = crs_info
+        await _disk_store(epsg_code, "info", asdict(crs_info))
         logger.info(f"Cached CRS info for EPSG:{epsg_code}: {crs_info.name}")
     
     return crs_info
@@ -153,8 +235,12 @@ async def get_proj4_string(epsg_code: int) -> Optional[str]:
     if epsg_code in _crs_cache and _crs_cache[epsg_code].proj4_text:
         return _crs_cache[epsg_code].proj4_text
     
-    fetcher = CRSFetcher()
-    proj4_str = await fetcher.fetch_proj4_string(epsg_code)
+    proj4_str = await _disk_lookup(epsg_code, "proj4")
+    if not proj4_str:
+        fetcher = _default_fetcher
+        proj4_str = await fetcher.fetch_proj4_string(epsg_code)
+        if proj4_str:
+            await _disk_store(epsg_code, "proj4", proj4_str)
     
     # Update cache
     if proj4_str and epsg_code in _crs_cache:
@@ -168,11 +254,31 @@ async def get_wkt_string(epsg_code: int) -> Optional[str]:
     if epsg_code in _crs_cache and _crs_cache[epsg_code].wkt:
         return _crs_cache[epsg_code].wkt
     
-    fetcher = CRSFetcher()
-    wkt_str = await fetcher.fetch_wkt_string(epsg_code)
+    wkt_str = await _disk_lookup(epsg_code, "wkt")
+    if not wkt_str:
+        fetcher = _default_fetcher
+        wkt_str = await fetcher.fetch_wkt_string(epsg_code)
+        if wkt_str:
+            await _disk_store(epsg_code, "wkt", wkt_str)
     
     # Update cache
     if wkt_str and epsg_code in _crs_cache:
         _crs_cache[epsg_code].wkt = wkt_str
     
-    return wkt_str
\ No newline at end of file
+    return wkt_str
+
+async def get_crs_definitions(epsg_code: int) -> Tuple[Optional[str], Optional[CRSInfo]]:
+    """Get Proj4 string and CRS info, fetching uncached parts concurrently
+    
+    WKT isn't needed to build transformers, so it is left to get_wkt_string.
+    """
+    proj4_str, crs_info = await asyncio.gather(
+        get_proj4_string(epsg_code),
+        get_crs_info(epsg_code)
+    )
+    
+    # The Proj4 lookup ran before the info was cached, so attach it now
+    if crs_info:
+        crs_info.proj4_text = crs_info.proj4_text or proj4_str
+    
+    return proj4_str, crs_info
\ No newline at end of file
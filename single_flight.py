@@ -0,0 +1,41 @@
+"""
+Single Flight
+
+Request coalescing for asyncio: concurrent callers asking for the same key
+share one in-flight call instead of each starting their own.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time and shares its outcome.
+
+    The call runs as its own task and every caller, the first one included,
+    awaits it through ``asyncio.shield``. A caller that is cancelled (e.g. a
+    disconnecting client) only stops waiting; the call carries on for the
+    others. If the call raises, every caller gets that same exception.
+    """
+
+    def __init__(self):
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+
+    async def run(self, key: Hashable, func: Callable[..., Awaitable[Any]], *args: Any) -> Any:
+        """Await ``func(*args)``, joining the call already running for ``key`` if there is one"""
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.create_task(func(*args))
+            self._tasks[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._tasks
+
+    def __len__(self) -> int:
+        return len(self._tasks)
@@ -0,0 +1,132 @@
+"""
+Coordinate Transformation Tests
+
+Tile validity and zoom handling for the coordinate transformer.
+"""
+
+import math
+
+import numpy as np
+import pytest
+
+import coordinates
+from config import settings
+from coordinates import CoordinateTransformer, TileCoordinate, tiles_to_bboxes_wgs84
+from wmts_capabilities import LayerInfo, TileMatrix, TileMatrixSet
+
+# LKS-92 / Latvia TM (EPSG:3059)
+LKS92_PROJ4 = ("+proj=tmerc +lat_0=0 +lon_0=24 +k=0.9996 +x_0=500000 +y_0=-6000000 "
+               "+ellps=GRS80 +towgs84=0,0,0,0,0,0,0 +units=m +no_defs")
+WEB_MERCATOR_PROJ4 = ("+proj=merc +a=6378137 +b=6378137 +lat_ts=0 +lon_0=0 +x_0=0 +y_0=0 +k=1 "
+                      "+units=m +nadgrids=@null +wktext +no_defs")
+PROJ4_BY_EPSG = {3059: LKS92_PROJ4, 3857: WEB_MERCATOR_PROJ4}
+
+# Topo10DTM covers all of Latvia, roughly 20.9-28.3 E
+LKS_LAYER = LayerInfo(
+    identifier="public:Topo10DTM",
+    title="Topo10DTM",
+    abstract=None,
+    wgs84_bounding_box=(20.9, 55.6, 28.3, 58.1),
+    tile_matrix_set_links=["LKS_LVM"],
+    formats=["image/png"],
+    styles=["raster"],
+)
+LKS_TILE_MATRIX_SET = TileMatrixSet(
+    identifier="LKS_LVM",
+    supported_crs="urn:ogc:def:crs:EPSG::3059",
+    epsg_code=3059,
+    well_known_scale_set=None,
+    tile_matrices={
+        z: TileMatrix(
+            identifier=f"LKS_LVM:{z}",
+            scale_denominator=98214.2857 * 2 ** (12 - z),
+            top_left_corner=(-5120900.0, 3998100.0),
+            tile_width=512,
+            tile_height=512,
+            matrix_width=2 ** z,
+            matrix_height=2 ** z,
+        )
+        for z in range(7, 19)
+    },
+)
+
+
+@pytest.fixture(autouse=True)
+def crs_cache_file(monkeypatch, tmp_path):
+    """Keep the CRS disk cache out of the working tree"""
+    monkeypatch.setattr(settings, "CRS_CACHE_FILE", str(tmp_path / "crs_cache.json"))
+
+
+@pytest.fixture
+def crs_definitions(monkeypatch):
+    """Answer CRS lookups from fixed Proj4 strings instead of spatialreference.org"""
+    async def fake_crs_definitions(epsg):
+        return PROJ4_BY_EPSG[epsg], None
+
+    monkeypatch.setattr(coordinates, "get_crs_definitions", fake_crs_definitions)
+
+
+@pytest.fixture
+def lks_capabilities(monkeypatch, crs_definitions):
+    """Serve LKS_LVM capabilities without network access"""
+    async def fake_wmts_info(url, layer_id, tile_matrix_set_id):
+        return LKS_LAYER, LKS_TILE_MATRIX_SET
+
+    monkeypatch.setattr(coordinates, "get_wmts_info", fake_wmts_info)
+
+
+def web_mercator_tile(z, lon, lat):
+    n = 2 ** z
+    x = int((lon + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n)
+    return TileCoordinate(z=z, x=x, y=y)
+
+
+@pytest.mark.asyncio
+async def test_world_edge_tile_is_valid_web_mercator():
+    transformer = CoordinateTransformer("WebMercatorQuad")
+
+    # Bottom-right tile of zoom 1 touches the antimeridian and the southern limit
+    assert await transformer.is_valid_tile(TileCoordinate(z=1, x=1, y=1))
+    assert not await transformer.is_valid_tile(TileCoordinate(z=1, x=2, y=1))
+    assert not await transformer.is_valid_tile(TileCoordinate(z=1, x=1, y=2))
+
+
+@pytest.mark.asyncio
+async def test_transformed_zoom_ignores_identifier_prefix(crs_definitions):
+    # EPSG:3857 tile matrix identifiers ("EPSG:3857:1") carry extra colons
+    transformer = CoordinateTransformer("EPSG:3857")
+
+    transformed = await transformer.transform_tile(TileCoordinate(z=1, x=1, y=1))
+    assert transformed.tile_matrix == "EPSG:3857:1"
+    assert transformed.tile_matrix_zoom == 1
+
+
+@pytest.mark.asyncio
+async def test_riga_tile_is_in_coverage(lks_capabilities):
+    transformer = CoordinateTransformer("LKS_LVM")
+
+    transformed = await transformer.transform_in_bounds(web_mercator_tile(12, 24.1, 56.95))
+    assert transformed is not None
+    assert transformed.tile_matrix == "LKS_LVM:12"
+
+
+@pytest.mark.asyncio
+async def test_tile_far_from_coverage_is_rejected(lks_capabilities):
+    transformer = CoordinateTransformer("LKS_LVM")
+
+    assert await transformer.transform_in_bounds(web_mercator_tile(12, 2.35, 48.85)) is None
+
+
+def test_tiles_to_bboxes_accepts_scalar_zoom():
+    xs = np.array([2322, 2323, 2324])
+    ys = np.array([1200, 1200, 1201])
+
+    bboxes = tiles_to_bboxes_wgs84(12, xs, ys)
+    assert bboxes.shape == (3, 4)
+    np.testing.assert_allclose(bboxes, tiles_to_bboxes_wgs84(np.full(3, 12), xs, ys))
+
+    expected = CoordinateTransformer("WebMercatorQuad").tile_to_bbox_wgs84(TileCoordinate(z=12, x=2323, y=1200))
+    np.testing.assert_allclose(
+        bboxes[1], [expected.min_lon, expected.min_lat, expected.max_lon, expected.max_lat]
+    )
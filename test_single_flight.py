@@ -0,0 +1,79 @@
+"""
+Single Flight Tests
+
+Sharing, cancellation and error propagation for coalesced calls.
+"""
+
+import asyncio
+
+import pytest
+
+from single_flight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    calls = []
+    release = asyncio.Event()
+
+    async def fetch(value):
+        calls.append(value)
+        await release.wait()
+        return value
+
+    waiters = [asyncio.create_task(flight.run("tile", fetch, "data")) for _ in range(5)]
+    await asyncio.sleep(0)
+    assert "tile" in flight
+
+    release.set()
+    assert await asyncio.gather(*waiters) == ["data"] * 5
+    assert calls == ["data"]
+    assert len(flight) == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_cancel_shared_call():
+    flight = SingleFlight()
+    release = asyncio.Event()
+
+    async def fetch():
+        await release.wait()
+        return "data"
+
+    first = asyncio.create_task(flight.run("tile", fetch))
+    second = asyncio.create_task(flight.run("tile", fetch))
+    await asyncio.sleep(0)
+
+    first.cancel()
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await second == "data"
+    assert first.cancelled()
+
+
+@pytest.mark.asyncio
+async def test_exception_reaches_every_waiter_and_clears_key():
+    flight = SingleFlight()
+    release = asyncio.Event()
+
+    async def fetch():
+        await release.wait()
+        raise RuntimeError("upstream failed")
+
+    waiters = [asyncio.create_task(flight.run("tile", fetch)) for _ in range(3)]
+    await asyncio.sleep(0)
+    release.set()
+
+    results = await asyncio.gather(*waiters, return_exceptions=True)
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+    await asyncio.sleep(0)
+    assert "tile" not in flight
+
+    # The next call for the key starts afresh
+    async def succeed():
+        return "data"
+
+    assert await flight.run("tile", succeed) == "data"
@@ -0,0 +1,67 @@
+"""
+Tile Cache Tests
+
+Sharding, expiry and eviction behaviour of the in-memory tile cache.
+"""
+
+import types
+
+import pytest
+
+import tile_cache
+from tile_cache import ShardedTileCache, make_tile_key
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Manually advanced replacement for time.monotonic inside tile_cache"""
+    now = [1000.0]
+    monkeypatch.setattr(tile_cache, "time", types.SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+def test_tile_row_spreads_across_shards():
+    cache = ShardedTileCache(maxsize=1000, ttl=60)
+    keys = [make_tile_key(0, 12, 2300 + i, 1200) for i in range(200)]
+
+    assert len({cache._shard_index(key) for key in keys}) == len(cache._shards)
+
+    for key in keys:
+        cache.set(key, b"tile")
+    assert len(cache) == len(keys)
+
+
+def test_endpoints_and_zooms_spread_across_shards():
+    cache = ShardedTileCache(maxsize=1000, ttl=60)
+
+    assert len({cache._shard_index(make_tile_key(e, 5, 3, 3)) for e in range(16)}) > 1
+    assert len({cache._shard_index(make_tile_key(0, z, 0, 0)) for z in range(16)}) > 1
+
+
+def test_entries_go_stale_after_ttl_and_expire_after_grace(clock):
+    cache = ShardedTileCache(maxsize=10, ttl=60, grace=30, shards=1)
+    etag = cache.set(1, b"tile")
+
+    clock[0] += 59
+    assert cache.get(1) == (b"tile", etag, False)
+
+    clock[0] += 2
+    assert cache.get(1) == (b"tile", etag, True)
+
+    clock[0] += 30
+    assert cache.get(1) is None
+    assert len(cache) == 0
+    assert cache.current_bytes == 0
+
+
+def test_byte_budget_evicts_least_recently_used(clock):
+    cache = ShardedTileCache(maxsize=100, ttl=60, max_bytes=10, shards=1)
+    cache.set(1, b"aaaa")
+    cache.set(2, b"bbbb")
+    cache.get(1)
+
+    cache.set(3, b"cccc")
+    assert cache.get(2) is None
+    assert cache.get(1) is not None
+    assert cache.get(3) is not None
+    assert cache.current_bytes == 8
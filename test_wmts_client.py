@@ -0,0 +1,22 @@
+"""
+WMTS Client Tests
+
+Upstream GetTile URL construction.
+"""
+
+from coordinates import TransformedTileCoordinate
+from wmts_client import WMTSClient
+
+
+def test_tile_url_matches_original_encoding():
+    # Upstream servers and CDN cache keys see exactly the bytes the original
+    # per-request query builder produced
+    client = WMTSClient("latvia", client=object())
+    tile = TransformedTileCoordinate(tile_matrix="LKS_LVM:9", tile_matrix_zoom=9, tile_col=12, tile_row=34)
+
+    assert client._tile_url(tile) == (
+        "https://lvmgeoproxy01.lvm.lv/wmts_b6948e305fb9446985a41b2aee54e07d/wmts"
+        "?layer=public:Topo10DTM&style=raster&tilematrixset=LKS_LVM&Service=WMTS"
+        "&Request=GetTile&Version=1.0.0&Format=image/vnd.jpeg-png8"
+        "&TileMatrix=LKS_LVM:9&TileCol=12&TileRow=34&appid=lvmgeo.lvm.lv/"
+    )
@@ -0,0 +1,163 @@
+"""
+Tile Cache
+
+Sharded in-memory LRU cache with lazy TTL expiry for processed tile bytes.
+Keys are packed integers so the hot lookup path is a few dict operations.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Set, Tuple
+
+# Packed key layout, high to low bits: endpoint id | z (5 bits) | x (21 bits) | y (21 bits)
+_Z_SHIFT = 42
+_X_SHIFT = 21
+_ENDPOINT_SHIFT = 47
+
+# 2**64 / golden ratio, for Fibonacci hashing of packed keys onto shards
+_FIBONACCI_MULTIPLIER = 0x9E3779B97F4A7C15
+_U64_MASK = (1 << 64) - 1
+
+
+def make_tile_key(endpoint_id: int, z: int, x: int, y: int) -> int:
+    """Pack an endpoint id and tile coordinate into one integer cache key.
+    
+    Callers must ensure z < 32 and x, y < 2**21 so fields don't overlap.
+    """
+    return (endpoint_id << _ENDPOINT_SHIFT) | (z << _Z_SHIFT) | (x << _X_SHIFT) | y
+
+
+def tile_etag(data: bytes) -> str:
+    """Strong ETag derived from the tile content"""
+    return '"' + hashlib.blake2b(data, digest_size=8).hexdigest() + '"'
+
+
+class ShardedTileCache:
+    """LRU cache split into independently locked shards.
+
+    Entries are stored as ``(inserted_at, data, etag)`` and expire lazily on lookup,
+    so there is never a full scan of the cache. Entries older than ``ttl`` but
+    within ``grace`` are still returned, flagged as stale, so callers can serve
+    them while refreshing in the background.
+
+    Each shard is bounded both by entry count and by the total size of the
+    tile bytes it holds, so memory use stays predictable whatever the tile sizes.
+    Eviction pops from the least-recently-used end of the shard; inserts also
+    drop entries at that end which are past the grace window, so dead tiles
+    don't hold memory while the shard is under its limits.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, grace: float = 0,
+                 max_bytes: Optional[int] = None, shards: int = 16):
+        if shards & (shards - 1):
+            raise ValueError("Shard count must be a power of two")
+        self.ttl = ttl
+        self.grace = grace
+        # Shard index is the top log2(shards) bits of the 64-bit Fibonacci hash
+        self._shard_shift = 64 - (shards.bit_length() - 1)
+        self._shard_maxsize = max(1, maxsize // shards)
+        self._shard_max_bytes = max_bytes // shards if max_bytes is not None else None
+        self._shards: List[OrderedDict] = [OrderedDict() for _ in range(shards)]
+        self._shard_bytes = [0] * shards
+        self._locks = [threading.Lock() for _ in range(shards)]
+
+    def _shard_index(self, key: int) -> int:
+        # Masking the key directly would shard on the low bits of y alone, putting
+        # a whole map row (and every zoom and endpoint) into one shard
+        return ((key * _FIBONACCI_MULTIPLIER) & _U64_MASK) >> self._shard_shift
+
+    def get(self, key: int) -> Optional[Tuple[bytes, str, bool]]:
+        """Return ``(data, etag, is_stale)`` or None if missing or past the grace window"""
+        index = self._shard_index(key)
+        shard = self._shards[index]
+        with self._locks[index]:
+            entry: Optional[Tuple[float, bytes, str]] = shard.get(key)
+            if entry is None:
+                return None
+            age = time.monotonic() - entry[0]
+            if age >= self.ttl + self.grace:
+                del shard[key]
+                self._shard_bytes[index] -= len(entry[1])
+                return None
+            shard.move_to_end(key)
+            return entry[1], entry[2], age >= self.ttl
+
+    def set(self, key: int, data: bytes) -> str:
+        """Store tile data and return its ETag"""
+        etag = tile_etag(data)
+        index = self._shard_index(key)
+        shard = self._shards[index]
+        now = time.monotonic()
+        with self._locks[index]:
+            previous = shard.pop(key, None)
+            if previous is not None:
+                self._shard_bytes[index] -= len(previous[1])
+            
+            # Only the LRU end is inspected, so this stays O(1) amortized
+            expires_before = now - self.ttl - self.grace
+            while shard:
+                oldest_key = next(iter(shard))
+                oldest = shard[oldest_key]
+                if oldest[0] > expires_before:
+                    break
+                del shard[oldest_key]
+                self._shard_bytes[index] -= len(oldest[1])
+            
+            shard[key] = (now, data, etag)
+            self._shard_bytes[index] += len(data)
+            while shard and (len(shard) > self._shard_maxsize or
+                             (self._shard_max_bytes is not None and
+                              self._shard_bytes[index] > self._shard_max_bytes)):
+                _, evicted = shard.popitem(last=False)
+                self._shard_bytes[index] -= len(evicted[1])
+        return etag
+
+    def clear(self) -> None:
+        for index, (shard, lock) in enumerate(zip(self._shards, self._locks)):
+            with lock:
+                shard.clear()
+                self._shard_bytes[index] = 0
+
+    @property
+    def current_bytes(self) -> int:
+        """Total size of cached tile data"""
+        return sum(self._shard_bytes)
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self._shards)
+
+
+class BoundedKeySet:
+    """Set of packed tile keys holding at most ``maxsize`` members.
+
+    Once full, each insert overwrites the oldest slot of a ring buffer, so
+    membership tests stay a plain set lookup with no bookkeeping.
+    """
+
+    def __init__(self, maxsize: int):
+        self._keys: Set[int] = set()
+        self._ring: List[Optional[int]] = [None] * maxsize
+        self._next = 0
+
+    def __contains__(self, key: int) -> bool:
+        return key in self._keys
+
+    def add(self, key: int) -> None:
+        if key in self._keys:
+            return
+        evicted = self._ring[self._next]
+        if evicted is not None:
+            self._keys.discard(evicted)
+        self._ring[self._next] = key
+        self._keys.add(key)
+        self._next = (self._next + 1) % len(self._ring)
+
+    def clear(self) -> None:
+        self._keys.clear()
+        self._ring = [None] * len(self._ring)
+        self._next = 0
+
+    def __len__(self) -> int:
+        return len(self._keys)
@@ -5,6 +5,8 @@ Predefined tile matrix limits extracted from WMTS GetCapabilities for the
 LKS_LVM coordinate system. Used for bounds checking to prevent invalid tile requests.
 """
 
+import numpy as np
+
 # Tile matrix limits for the Topo10DTM layer in LKS_LVM coordinate system
 LKS_LVM_TILE_LIMITS = {
     7: {"min_col": 19, "max_col": 99, "min_row": 1, "max_row": 48},
@@ -22,14 +24,51 @@ LKS_LVM_TILE_LIMITS = {
 }
 
 
+# (min_col, max_col, min_row, max_row) indexed directly by zoom level, None where undefined
+_LIMITS_BY_ZOOM = tuple(
+    (limits["min_col"], limits["max_col"], limits["min_row"], limits["max_row"])
+    if limits else None
+    for limits in (LKS_LVM_TILE_LIMITS.get(z) for z in range(max(LKS_LVM_TILE_LIMITS) + 1))
+)
+
+# The same limits as one contiguous (zoom, 4) table for batch checks. Undefined zooms
+# get limits no tile can satisfy, kept well clear of int64 overflow in the differences.
+_NO_TILE_MIN = 1 << 62
+_NO_TILE_MAX = -1
+_NO_TILE_LIMITS = (_NO_TILE_MIN, _NO_TILE_MAX, _NO_TILE_MIN, _NO_TILE_MAX)
+_LIMITS = np.array([l if l else _NO_TILE_LIMITS for l in _LIMITS_BY_ZOOM], dtype=np.int64)
+
+
 def is_tile_in_bounds(zoom_level: int, tile_col: int, tile_row: int) -> bool:
     """Check if a tile coordinate is within the valid bounds for LKS_LVM"""
-    if zoom_level not in LKS_LVM_TILE_LIMITS:
+    if not 0 <= zoom_level < len(_LIMITS_BY_ZOOM):
+        return False
+    
+    limits = _LIMITS_BY_ZOOM[zoom_level]
+    if limits is None:
         return False
     
-    limits = LKS_LVM_TILE_LIMITS[zoom_level]
-    return (limits["min_col"] <= tile_col <= limits["max_col"] and 
-            limits["min_row"] <= tile_row <= limits["max_row"])
+    # Each difference is negative exactly when that bound is violated, so the
+    # OR of all four has its sign set iff the tile is out of bounds
+    min_col, max_col, min_row, max_row = limits
+    return ((tile_col - min_col) | (max_col - tile_col) |
+            (tile_row - min_row) | (max_row - tile_row)) >= 0
+
+
+def is_tile_in_bounds_batch(zoom_levels, tile_cols, tile_rows) -> np.ndarray:
+    """Vectorized is_tile_in_bounds over arrays of tile coordinates, returning a boolean mask"""
+    zoom_levels = np.asarray(zoom_levels, dtype=np.int64)
+    tile_cols = np.asarray(tile_cols, dtype=np.int64)
+    tile_rows = np.asarray(tile_rows, dtype=np.int64)
+    
+    known_zoom = (zoom_levels >= 0) & (zoom_levels < len(_LIMITS_BY_ZOOM))
+    z = np.where(known_zoom, zoom_levels, 0)
+    
+    # Same sign-bit test as is_tile_in_bounds, with one row gather for all four limits
+    min_col, max_col, min_row, max_row = _LIMITS[z].T
+    sign = ((tile_cols - min_col) | (max_col - tile_cols) |
+            (tile_rows - min_row) | (max_row - tile_rows))
+    return known_zoom & (sign >= 0)
 
 
 def get_tile_limits(zoom_level: int) -> dict:
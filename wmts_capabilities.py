@@ -4,14 +4,84 @@ WMTS Capabilities Parser
 Dynamically fetches and parses WMTS GetCapabilities XML to extract tile matrix
 parameters, layer information, and coordinate system details.
 """
+import functools
+import io
+import re
 import xml.etree.ElementTree as ET
 import httpx
 import logging
-from typing import Dict, Tuple, Optional, List
+from typing import Dict, Tuple, Optional, List, Union
 from dataclasses import dataclass
 
 logger = logging.getLogger(__name__)
 
+# Element tags in Clark notation. Plain tag lookups stay on ElementTree's C fast
+# path; prefixed paths with a namespace map go through the Python ElementPath.
+_OWS = '{http://www.opengis.net/ows/1.1}'
+_WMTS = '{http://www.opengis.net/wmts/1.0}'
+_OWS_ABSTRACT = _OWS + 'Abstract'
+_OWS_IDENTIFIER = _OWS + 'Identifier'
+_OWS_LOWER_CORNER = _OWS + 'LowerCorner'
+_OWS_SUPPORTED_CRS = _OWS + 'SupportedCRS'
+_OWS_TITLE = _OWS + 'Title'
+_OWS_UPPER_CORNER = _OWS + 'UpperCorner'
+_OWS_WGS84_BOUNDING_BOX = _OWS + 'WGS84BoundingBox'
+_WMTS_FORMAT = _WMTS + 'Format'
+_WMTS_LAYER = _WMTS + 'Layer'
+_WMTS_MATRIX_HEIGHT = _WMTS + 'MatrixHeight'
+_WMTS_MATRIX_WIDTH = _WMTS + 'MatrixWidth'
+_WMTS_SCALE_DENOMINATOR = _WMTS + 'ScaleDenominator'
+_WMTS_STYLE = _WMTS + 'Style'
+_WMTS_TILE_HEIGHT = _WMTS + 'TileHeight'
+_WMTS_TILE_MATRIX = _WMTS + 'TileMatrix'
+_WMTS_TILE_MATRIX_SET = _WMTS + 'TileMatrixSet'
+_WMTS_TILE_MATRIX_SET_LINK = _WMTS + 'TileMatrixSetLink'
+_WMTS_TILE_WIDTH = _WMTS + 'TileWidth'
+_WMTS_TOP_LEFT_CORNER = _WMTS + 'TopLeftCorner'
+_WMTS_WELL_KNOWN_SCALE_SET = _WMTS + 'WellKnownScaleSet'
+
+# EPSG code is the trailing number after the authority, whatever version
+# segments sit between (EPSG:3059, urn:ogc:def:crs:EPSG::3059, .../EPSG/0/3059)
+_EPSG_CODE_RE = re.compile(r'EPSG[:/].*?(\d+)$')
+
+
+@functools.lru_cache(maxsize=256)
+def _epsg_from_crs(supported_crs: str) -> Optional[int]:
+    """EPSG code from a SupportedCRS string (e.g. "urn:ogc:def:crs:EPSG:6.18:3:3059" -> 3059)"""
+    match = _EPSG_CODE_RE.search(supported_crs.strip())
+    return int(match.group(1)) if match else None
+
+
+@functools.lru_cache(maxsize=256)
+def _zoom_from_identifier(identifier: str) -> int:
+    """Zoom level from a TileMatrix identifier (e.g. "LKS_LVM:10" -> 10)"""
+    return int(identifier.rsplit(':', 1)[1])
+
+# Client used for GetCapabilities requests. The app shares its pooled tile
+# client here; standalone use falls back to a lazily created one of our own.
+_http_client: Optional[httpx.AsyncClient] = None
+_owns_http_client = False
+
+def _get_http_client() -> httpx.AsyncClient:
+    global _http_client, _owns_http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(timeout=30.0, http2=True)
+        _owns_http_client = True
+    return _http_client
+
+def use_capabilities_client(client: httpx.AsyncClient):
+    """Fetch capabilities through an existing client, owned and closed by the caller"""
+    global _http_client, _owns_http_client
+    _http_client = client
+    _owns_http_client = False
+
+async def close_capabilities_client():
+    """Close the capabilities client if this module created it"""
+    global _http_client
+    if _http_client is not None and _owns_http_client:
+        await _http_client.aclose()
+    _http_client = None
+
 @dataclass
 class TileMatrix:
     identifier: str
@@ -56,37 +126,73 @@ class WMTSCapabilitiesParser:
             'VERSION': '1.0.0'
         }
         
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(self.capabilities_url, params=params)
-            response.raise_for_status()
-            return response.text
+        response = await _get_http_client().get(self.capabilities_url, params=params)
+        response.raise_for_status()
+        return response.text
     
-    def parse_tile_matrix_set(self, capabilities_xml: str, tile_matrix_set_id: str) -> Optional[TileMatrixSet]:
-        """Parse a specific TileMatrixSet from capabilities"""
-        try:
-            root = ET.fromstring(capabilities_xml)
+    def _find_elements(self, capabilities_xml: Union[str, ET.Element],
+                       tile_matrix_set_id: Optional[str] = None,
+                       layer_id: Optional[str] = None) -> Tuple[Optional[ET.Element], Optional[ET.Element]]:
+        """Find the requested TileMatrixSet and Layer elements in one pass
+        
+        XML text is stream-parsed and the walk stops as soon as every requested
+        element has been seen. Sections that don't match are cleared as they
+        complete, so the document is never held in memory as a whole.
+        """
+        if isinstance(capabilities_xml, ET.Element):
+            # Already parsed by the caller, so walk it without clearing anything
+            streaming = False
+            elements = capabilities_xml.iter()
+        else:
+            streaming = True
+            elements = (elem for _, elem in ET.iterparse(io.StringIO(capabilities_xml)))
+        
+        tms_elem = None
+        layer_elem = None
+        
+        for elem in elements:
+            if elem.tag == _WMTS_TILE_MATRIX_SET:
+                # TileMatrixSet references inside TileMatrixSetLink have no Identifier
+                identifier_elem = elem.find(_OWS_IDENTIFIER)
+                if identifier_elem is None:
+                    continue
+                if tms_elem is None and identifier_elem.text == tile_matrix_set_id:
+                    tms_elem = elem
+                elif streaming:
+                    elem.clear()
+            elif elem.tag == _WMTS_LAYER:
+                identifier_elem = elem.find(_OWS_IDENTIFIER)
+                if layer_elem is None and identifier_elem is not None and identifier_elem.text == layer_id:
+                    layer_elem = elem
+                elif streaming:
+                    elem.clear()
+            else:
+                continue
             
-            # Find the TileMatrixSet
-            for tms_elem in root.findall('.//wmts:TileMatrixSet', self.namespaces):
-                identifier_elem = tms_elem.find('ows:Identifier', self.namespaces)
-                if identifier_elem is not None and identifier_elem.text == tile_matrix_set_id:
-                    return self._parse_tile_matrix_set_element(tms_elem)
+            if ((tms_elem is not None or tile_matrix_set_id is None) and
+                    (layer_elem is not None or layer_id is None)):
+                break
+        
+        return tms_elem, layer_elem
+    
+    def parse_tile_matrix_set(self, capabilities_xml: Union[str, ET.Element], tile_matrix_set_id: str) -> Optional[TileMatrixSet]:
+        """Parse a specific TileMatrixSet from capabilities XML or a parsed root"""
+        try:
+            tms_elem, _ = self._find_elements(capabilities_xml, tile_matrix_set_id=tile_matrix_set_id)
+            if tms_elem is not None:
+                return self._parse_tile_matrix_set_element(tms_elem)
             
             return None
         except Exception as e:
             logger.error(f"Failed to parse TileMatrixSet {tile_matrix_set_id}: {e}")
             return None
     
-    def parse_layer_info(self, capabilities_xml: str, layer_id: str) -> Optional[LayerInfo]:
-        """Parse layer information from capabilities"""
+    def parse_layer_info(self, capabilities_xml: Union[str, ET.Element], layer_id: str) -> Optional[LayerInfo]:
+        """Parse layer information from capabilities XML or a parsed root"""
         try:
-            root = ET.fromstring(capabilities_xml)
-            
-            # Find the Layer
-            for layer_elem in root.findall('.//wmts:Layer', self.namespaces):
-                identifier_elem = layer_elem.find('ows:Identifier', self.namespaces)
-                if identifier_elem is not None and identifier_elem.text == layer_id:
-                    return self._parse_layer_element(layer_elem)
+            _, layer_elem = self._find_elements(capabilities_xml, layer_id=layer_id)
+            if layer_elem is not None:
+                return self._parse_layer_element(layer_elem)
             
             return None
         except Exception as e:
@@ -95,19 +201,19 @@ class WMTSCapabilitiesParser:
     
     def _parse_layer_element(self, layer_elem) -> LayerInfo:
         """Parse a Layer element"""
-        identifier = layer_elem.find('ows:Identifier', self.namespaces).text
-        title_elem = layer_elem.find('ows:Title', self.namespaces)
+        identifier = layer_elem.find(_OWS_IDENTIFIER).text
+        title_elem = layer_elem.find(_OWS_TITLE)
         title = title_elem.text if title_elem is not None else identifier
         
-        abstract_elem = layer_elem.find('ows:Abstract', self.namespaces)
+        abstract_elem = layer_elem.find(_OWS_ABSTRACT)
         abstract = abstract_elem.text if abstract_elem is not None else None
         
         # Parse WGS84BoundingBox
         wgs84_bbox = None
-        bbox_elem = layer_elem.find('ows:WGS84BoundingBox', self.namespaces)
+        bbox_elem = layer_elem.find(_OWS_WGS84_BOUNDING_BOX)
         if bbox_elem is not None:
-            lower_corner = bbox_elem.find('ows:LowerCorner', self.namespaces)
-            upper_corner = bbox_elem.find('ows:UpperCorner', self.namespaces)
+            lower_corner = bbox_elem.find(_OWS_LOWER_CORNER)
+            upper_corner = bbox_elem.find(_OWS_UPPER_CORNER)
             if lower_corner is not None and upper_corner is not None:
                 lower_coords = [float(x) for x in lower_corner.text.strip().split()]
                 upper_coords = [float(x) for x in upper_corner.text.strip().split()]
@@ -116,20 +222,20 @@ class WMTSCapabilitiesParser:
         
         # Parse TileMatrixSetLink
         tile_matrix_set_links = []
-        for link_elem in layer_elem.findall('wmts:TileMatrixSetLink', self.namespaces):
-            tms_ref = link_elem.find('wmts:TileMatrixSet', self.namespaces)
+        for link_elem in layer_elem.findall(_WMTS_TILE_MATRIX_SET_LINK):
+            tms_ref = link_elem.find(_WMTS_TILE_MATRIX_SET)
             if tms_ref is not None:
                 tile_matrix_set_links.append(tms_ref.text)
         
         # Parse formats
         formats = []
-        for format_elem in layer_elem.findall('wmts:Format', self.namespaces):
+        for format_elem in layer_elem.findall(_WMTS_FORMAT):
             formats.append(format_elem.text)
         
         # Parse styles
         styles = []
-        for style_elem in layer_elem.findall('wmts:Style', self.namespaces):
-            style_id = style_elem.find('ows:Identifier', self.namespaces)
+        for style_elem in layer_elem.findall(_WMTS_STYLE):
+            style_id = style_elem.find(_OWS_IDENTIFIER)
             if style_id is not None:
                 styles.append(style_id.text)
         
@@ -147,44 +253,20 @@ class WMTSCapabilitiesParser:
     
     def _parse_tile_matrix_set_element(self, tms_elem) -> TileMatrixSet:
         """Parse a TileMatrixSet element"""
-        identifier = tms_elem.find('ows:Identifier', self.namespaces).text
-        supported_crs = tms_elem.find('ows:SupportedCRS', self.namespaces).text
+        identifier = tms_elem.find(_OWS_IDENTIFIER).text
+        supported_crs = tms_elem.find(_OWS_SUPPORTED_CRS).text
         
-        # Extract EPSG code from CRS string (e.g., "urn:ogc:def:crs:EPSG:6.18:3:3059" -> 3059)
-        epsg_code = None
-        if supported_crs:
-            if 'EPSG' in supported_crs:
-                # Handle various EPSG URI formats
-                if ':' in supported_crs:
-                    parts = supported_crs.split(':')
-                    for i, part in enumerate(parts):
-                        if part == 'EPSG' and i + 1 < len(parts):
-                            # Try to find the numeric EPSG code
-                            for j in range(i + 1, len(parts)):
-                                try:
-                                    epsg_code = int(parts[j])
-                                    break
-                                except ValueError:
-                                    continue
-                            break
-                else:
-                    # Simple EPSG:XXXX format
-                    try:
-                        epsg_code = int(supported_crs.replace('EPSG:', ''))
-                    except ValueError:
-                        pass
+        epsg_code = _epsg_from_crs(supported_crs) if supported_crs else None
         
         # Check for WellKnownScaleSet
-        well_known_scale_set_elem = tms_elem.find('wmts:WellKnownScaleSet', self.namespaces)
+        well_known_scale_set_elem = tms_elem.find(_WMTS_WELL_KNOWN_SCALE_SET)
         well_known_scale_set = well_known_scale_set_elem.text if well_known_scale_set_elem is not None else None
         
         tile_matrices = {}
         
-        for tm_elem in tms_elem.findall('wmts:TileMatrix', self.namespaces):
+        for tm_elem in tms_elem.findall(_WMTS_TILE_MATRIX):
             tile_matrix = self._parse_tile_matrix_element(tm_elem)
-            # Extract zoom level from identifier (e.g., "LKS_LVM:10" -> 10)
-            zoom_level = int(tile_matrix.identifier.split(':')[1])
-            tile_matrices[zoom_level] = tile_matrix
+            tile_matrices[_zoom_from_identifier(tile_matrix.identifier)] = tile_matrix
         
         logger.info(f"Parsed TileMatrixSet '{identifier}': CRS={supported_crs}, EPSG={epsg_code}, WellKnownScaleSet={well_known_scale_set}")
         
@@ -198,18 +280,18 @@ class WMTSCapabilitiesParser:
     
     def _parse_tile_matrix_element(self, tm_elem) -> TileMatrix:
         """Parse a TileMatrix element"""
-        identifier = tm_elem.find('ows:Identifier', self.namespaces).text
-        scale_denominator = float(tm_elem.find('wmts:ScaleDenominator', self.namespaces).text)
+        identifier = tm_elem.find(_OWS_IDENTIFIER).text
+        scale_denominator = float(tm_elem.find(_WMTS_SCALE_DENOMINATOR).text)
         
         # Parse TopLeftCorner
-        top_left_text = tm_elem.find('wmts:TopLeftCorner', self.namespaces).text
+        top_left_text = tm_elem.find(_WMTS_TOP_LEFT_CORNER).text
         top_left_coords = [float(x) for x in top_left_text.strip().split()]
         top_left_corner = (top_left_coords[0], top_left_coords[1])
         
-        tile_width = int(tm_elem.find('wmts:TileWidth', self.namespaces).text)
-        tile_height = int(tm_elem.find('wmts:TileHeight', self.namespaces).text)
-        matrix_width = int(tm_elem.find('wmts:MatrixWidth', self.namespaces).text)
-        matrix_height = int(tm_elem.find('wmts:MatrixHeight', self.namespaces).text)
+        tile_width = int(tm_elem.find(_WMTS_TILE_WIDTH).text)
+        tile_height = int(tm_elem.find(_WMTS_TILE_HEIGHT).text)
+        matrix_width = int(tm_elem.find(_WMTS_MATRIX_WIDTH).text)
+        matrix_height = int(tm_elem.find(_WMTS_MATRIX_HEIGHT).text)
         
         return TileMatrix(
             identifier=identifier,
@@ -262,12 +344,18 @@ async def get_layer_info(capabilities_url: str, layer_id: str) -> Optional[Layer
 
 async def get_wmts_info(capabilities_url: str, layer_id: str, tile_matrix_set_id: str) -> Tuple[Optional[LayerInfo], Optional[TileMatrixSet]]:
     """Get both layer and tile matrix set information in one call"""
-    # Fetch capabilities once and parse both
+    # Fetch capabilities once and find both in a single streaming pass
     parser = WMTSCapabilitiesParser(capabilities_url)
     capabilities_xml = await parser.fetch_capabilities()
     
-    layer_info = parser.parse_layer_info(capabilities_xml, layer_id)
-    tile_matrix_set = parser.parse_tile_matrix_set(capabilities_xml, tile_matrix_set_id)
+    try:
+        tms_elem, layer_elem = parser._find_elements(capabilities_xml, tile_matrix_set_id, layer_id)
+    except ET.ParseError as e:
+        logger.error(f"Failed to parse capabilities from {capabilities_url}: {e}")
+        return None, None
+    
+    layer_info = parser.parse_layer_info(layer_elem, layer_id) if layer_elem is not None else None
+    tile_matrix_set = parser.parse_tile_matrix_set(tms_elem, tile_matrix_set_id) if tms_elem is not None else None
     
     # Cache individually
     if layer_info:
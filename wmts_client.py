@@ -5,41 +5,106 @@ HTTP client for fetching tiles from WMTS servers. Handles tile requests,
 quadrant extraction for 512x512 WMTS tiles, and error handling.
 """
 
+import asyncio
+import functools
 import httpx
 import logging
-from urllib.parse import urlencode, quote
-from typing import Optional
+import struct
+from urllib.parse import quote
+from typing import List, Optional, Tuple
+from cachetools import TTLCache
 from coordinates import TransformedTileCoordinate
+from single_flight import SingleFlight
 from config import settings, WMTSEndpoint
 from PIL import Image
 import io
 
 logger = logging.getLogger(__name__)
 
+# Processed tiles kept per client. Several Leaflet tiles can map onto the same
+# WMTS tile and quadrant, so this catches repeats the response cache can't.
+PROCESSED_TILE_CACHE_SIZE = 1024
+
+# Decoded 512x512 source tiles kept per client (~768 KB each as RGB). Leaflet
+# requests sibling quadrants together, so a short window is enough.
+SOURCE_IMAGE_CACHE_SIZE = 32
+SOURCE_IMAGE_TTL = 60
+
+_PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+
+def _png_size(content: bytes) -> Optional[Tuple[int, int]]:
+    """Width and height from a PNG's IHDR chunk, without decoding; None if not a PNG"""
+    if len(content) < 24 or content[:8] != _PNG_SIGNATURE or content[12:16] != b'IHDR':
+        return None
+    return struct.unpack('>II', content[16:24])
+
+
+@functools.lru_cache(maxsize=256)
+def _quote_tile_matrix(tile_matrix: str) -> str:
+    """URL-encoded tile matrix identifier; there are only a few dozen distinct ones"""
+    return quote(tile_matrix, safe=':')
+
 
 class WMTSClient:
-    def __init__(self, endpoint_name: Optional[str] = None):
-        self.client = httpx.AsyncClient(timeout=30.0)
+    def __init__(self, endpoint_name: Optional[str] = None, client: Optional[httpx.AsyncClient] = None):
+        # A shared client is owned (and closed) by whoever created it
+        self._owns_client = client is None
+        self.client = client or httpx.AsyncClient(timeout=30.0)
         self.endpoint = settings.get_endpoint(endpoint_name)
-    
-    async def fetch_tile(self, tile_coord: TransformedTileCoordinate) -> Optional[bytes]:
-        params = {
+        
+        # Only the tile position varies per request, so encode everything else once
+        static_params = {
             "layer": self.endpoint.layer,
             "style": self.endpoint.style,
             "tilematrixset": self.endpoint.coordinate_system,
             "Service": "WMTS",
             "Request": "GetTile",
             "Version": "1.0.0",
-            "Format": self.endpoint.format,
-            "TileMatrix": tile_coord.tile_matrix,
-            "TileCol": str(tile_coord.tile_col),
-            "TileRow": str(tile_coord.tile_row)
+            "Format": self.endpoint.format
         }
         
-        if self.endpoint.app_id:
-            params["appid"] = self.endpoint.app_id
+        self._url_prefix = f"{self.endpoint.url}?{self._build_query_string(static_params)}&"
+        # The app id goes after the tile position, where upstream has always seen it
+        self._url_suffix = f"&appid={self.endpoint.app_id}" if self.endpoint.app_id else ""
+        
+        # Processed output keyed by transformed coordinate; expires with the response cache
+        self._processed_tiles: TTLCache = TTLCache(maxsize=PROCESSED_TILE_CACHE_SIZE, ttl=settings.CACHE_TTL)
+        self._source_images: TTLCache = TTLCache(maxsize=SOURCE_IMAGE_CACHE_SIZE, ttl=SOURCE_IMAGE_TTL)
+        # Upstream fetches in progress, keyed like _source_images
+        self._inflight = SingleFlight()
+    
+    async def fetch_tile(self, tile_coord: TransformedTileCoordinate) -> Optional[bytes]:
+        cached = self._processed_tiles.get(tile_coord)
+        if cached is not None:
+            return cached
+        
+        # A sibling quadrant may already have fetched and decoded the source tile
+        source_key = (tile_coord.tile_matrix, tile_coord.tile_col, tile_coord.tile_row)
+        source_image = self._source_images.get(source_key)
+        if source_image is None:
+            content = await self._inflight.run(source_key, self._request_source, tile_coord)
+            if content is None:
+                return None
+            
+            # Siblings waiting on the same fetch resume one at a time, so only
+            # the first decodes and the rest crop from its cached source
+            source_image = self._source_images.get(source_key)
         
-        url = f"{self.endpoint.url}?{self._build_query_string(params)}"
+        if source_image is not None:
+            tile_data = self._encode_tile(self._crop_quadrant(source_image, tile_coord))
+        else:
+            tile_data = self._process_tile(content, tile_coord, source_key)
+        self._processed_tiles[tile_coord] = tile_data
+        return tile_data
+    
+    async def fetch_tiles(self, tile_coords: List[TransformedTileCoordinate]) -> List[Optional[bytes]]:
+        """Fetch several tiles concurrently, e.g. a whole viewport, in input order"""
+        return await asyncio.gather(*(self.fetch_tile(tile_coord) for tile_coord in tile_coords))
+    
+    async def _request_source(self, tile_coord: TransformedTileCoordinate) -> Optional[bytes]:
+        """Fetch a raw upstream tile, or None if the server had no usable image"""
+        url = self._tile_url(tile_coord)
         
         try:
             logger.info(f"Fetching tile from: {url}")
@@ -49,39 +114,7 @@ class WMTSClient:
                 content_type = response.headers.get("content-type", "")
                 if "image" in content_type:
                     logger.info(f"Successfully fetched tile: {tile_coord.tile_matrix}/{tile_coord.tile_col}/{tile_coord.tile_row}")
-                    
-                    # Handle 512x512 tiles for Leaflet compatibility
-                    try:
-                        # Open the image
-                        image = Image.open(io.BytesIO(response.content))
-                        original_size = image.size
-                        
-                        if image.size == (512, 512):
-                            # Cut 512x512 tile into the appropriate 256x256 quadrant
-                            quadrant_x = getattr(tile_coord, 'quadrant_x', 0)
-                            quadrant_y = getattr(tile_coord, 'quadrant_y', 0)
-                            
-                            # Calculate crop coordinates
-                            left = quadrant_x * 256
-                            top = quadrant_y * 256
-                            right = left + 256
-                            bottom = top + 256
-                            
-                            # Crop the appropriate quadrant
-                            image = image.crop((left, top, right, bottom))
-                            logger.info(f"Cut tile from {original_size} to 256x256 quadrant ({quadrant_x},{quadrant_y})")
-                        elif image.size != (256, 256):
-                            # Resize other sizes to 256x256
-                            image = image.resize((256, 256), Image.Resampling.LANCZOS)
-                            logger.info(f"Resized tile from {original_size} to 256x256")
-                        
-                        # Convert back to bytes as PNG for better compatibility
-                        output = io.BytesIO()
-                        image.save(output, format='PNG')
-                        return output.getvalue()
-                    except Exception as e:
-                        logger.warning(f"Failed to process tile, returning original: {e}")
-                        return response.content
+                    return response.content
                 else:
                     logger.error(f"Invalid content type: {content_type}")
                     return None
@@ -93,16 +126,68 @@ class WMTSClient:
             logger.error(f"Error fetching tile: {str(e)}")
             return None
     
+    def _process_tile(self, content: bytes, tile_coord: TransformedTileCoordinate,
+                      source_key: Tuple[str, int, int]) -> bytes:
+        """Turn an upstream tile into a 256x256 PNG for Leaflet"""
+        # A 256x256 PNG is already what Leaflet wants, so pass it through untouched
+        if _png_size(content) == (256, 256):
+            return content
+        
+        # Handle 512x512 tiles for Leaflet compatibility
+        try:
+            # Open the image
+            image = Image.open(io.BytesIO(content))
+            original_size = image.size
+            
+            if image.size == (512, 512):
+                # Decode once and keep the source, so the other three quadrants
+                # are cropped from memory instead of fetched and decoded again
+                image.load()
+                self._source_images[source_key] = image
+                
+                # Cut 512x512 tile into the appropriate 256x256 quadrant
+                image = self._crop_quadrant(image, tile_coord)
+                logger.info(f"Cut tile from {original_size} to 256x256 quadrant ({tile_coord.quadrant_x},{tile_coord.quadrant_y})")
+            elif image.size != (256, 256):
+                # Let libjpeg downscale by a power of two while decoding,
+                # leaving less work for the resize
+                if image.format == "JPEG":
+                    image.draft("RGB", (256, 256))
+                
+                # Resize other sizes to 256x256
+                image = image.resize((256, 256), Image.Resampling.LANCZOS)
+                logger.info(f"Resized tile from {original_size} to 256x256")
+            
+            return self._encode_tile(image)
+        except Exception as e:
+            logger.warning(f"Failed to process tile, returning original: {e}")
+            return content
+    
+    def _crop_quadrant(self, image: Image.Image, tile_coord: TransformedTileCoordinate) -> Image.Image:
+        """Cut the 256x256 quadrant a Leaflet tile covers out of a 512x512 WMTS tile"""
+        left = tile_coord.quadrant_x * 256
+        top = tile_coord.quadrant_y * 256
+        return image.crop((left, top, left + 256, top + 256))
+    
+    def _encode_tile(self, image: Image.Image) -> bytes:
+        # Convert back to bytes as PNG for better compatibility. Tiles
+        # are short-lived, so favour encode speed over size
+        output = io.BytesIO()
+        image.save(output, format='PNG', optimize=False, compress_level=1)
+        return output.getvalue()
+    
+    def _tile_url(self, tile_coord: TransformedTileCoordinate) -> str:
+        return (f"{self._url_prefix}TileMatrix={_quote_tile_matrix(tile_coord.tile_matrix)}"
+                f"&TileCol={tile_coord.tile_col}&TileRow={tile_coord.tile_row}{self._url_suffix}")
+    
     def _build_query_string(self, params: dict) -> str:
-        encoded_params = []
-        for key, value in params.items():
-            if key == "layer":
-                encoded_params.append(f"{key}={quote(value, safe=':')}")
-            elif key == "TileMatrix":
-                encoded_params.append(f"{key}={quote(value, safe=':')}")
-            else:
-                encoded_params.append(f"{key}={value}")
-        return "&".join(encoded_params)
+        # Only the layer name is percent-encoded (keeping ':' literal, as WMTS servers
+        # expect); other values go out verbatim, so URLs and CDN cache keys stay stable
+        return "&".join(
+            f"{key}={quote(value, safe=':')}" if key == "layer" else f"{key}={value}"
+            for key, value in params.items()
+        )
     
     async def close(self):
-        await self.client.aclose()
\ No newline at end of file
+        if self._owns_client:
+            await self.client.aclose()
\ No newline at end of file